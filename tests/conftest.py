@@ -2,93 +2,258 @@
 Shared pytest fixtures and configuration for all tests
 """
 import pytest
-import tempfile
-import sqlite3
-from datetime import datetime, timedelta
-from pathlib import Path
-from unittest.mock import Mock, patch, MagicMock
+import functools
+import importlib.util
+import json
+import uuid
+from contextlib import ExitStack
+from datetime import datetime
 import sys
 import os
 
 # Add parent directory to path for imports
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+
+# Settings the bot refuses to start without, plus an in-memory database
+_TEST_ENV = {
+    'TELEGRAM_BOT_TOKEN': 'test_token',
+    'TELEGRAM_CHAT_ID': 'test_chat',
+    'DB_PATH': ':memory:'
+}
+
+
+@functools.lru_cache(maxsize=1)
+def _load_uptime_bot():
+    """Import the main application module once, as ``uptime_bot``
+    
+    The script's file name is not a valid module name, so it is loaded from
+    its path and registered in ``sys.modules``. This can happen while test
+    modules are collected, so the test settings are supplied for the import
+    itself.
+    """
+    if "uptime_bot" in sys.modules:
+        return sys.modules["uptime_bot"]
+    
+    from unittest.mock import patch
+    
+    spec = importlib.util.spec_from_file_location(
+        "uptime_bot", os.path.join(ROOT_DIR, "uptime-telegram-bot.py"))
+    uptime_bot = importlib.util.module_from_spec(spec)
+    sys.modules["uptime_bot"] = uptime_bot
+    with patch.dict(os.environ, {key: value for key, value in _TEST_ENV.items()
+                                 if key not in os.environ}):
+        spec.loader.exec_module(uptime_bot)
+    return uptime_bot
 
-# Import the main application components
-import importlib.util
-spec = importlib.util.spec_from_file_location("uptime_bot", "uptime-telegram-bot.py")
-uptime_bot = importlib.util.module_from_spec(spec)
-sys.modules["uptime_bot"] = uptime_bot
-spec.loader.exec_module(uptime_bot)
 
-from uptime_bot import DatabaseManager, OutageAnalyzer, MonitorEvent, TelegramNotifier
+def pytest_collectstart(collector):
+    """Register ``uptime_bot`` just before importing a test module that uses it
+    
+    Modules that never mention it are collected without loading the bot.
+    """
+    if (isinstance(collector, pytest.Module)
+            and "uptime_bot" in collector.path.read_text(encoding="utf-8")):
+        _load_uptime_bot()
+
+
+@pytest.fixture(scope="session")
+def uptime_bot_module():
+    """The application module, executed once per session"""
+    return _load_uptime_bot()
+
+
+# pytest-xdist worker id, used to keep per-worker database names apart
+_WORKER = os.environ.get('PYTEST_XDIST_WORKER', 'gw0')
 
 
 @pytest.fixture
 def temp_db():
-    """Create a temporary database for testing"""
-    with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as f:
-        db_path = f.name
+    """Create a temporary in-memory database URI for testing"""
+    db_uri = f"file:testdb_{_WORKER}_{uuid.uuid4().hex}?mode=memory&cache=shared"
+    
+    import sqlite3
+    
+    # Keep one connection open so the shared in-memory database lives
+    # for the whole test
+    keepalive = sqlite3.connect(db_uri, uri=True)
+    yield db_uri
+    keepalive.close()
+
+
+@pytest.fixture
+def temp_db_file(tmp_path):
+    """Path to a file-backed database; pytest cleans up ``tmp_path``"""
+    return str(tmp_path / "test.db")
+
+
+# Set UPTIME_BOT_TEST_FAST=0 to run the suite with SQLite's default durability
+FAST_SQLITE = os.environ.get('UPTIME_BOT_TEST_FAST', '1') == '1'
+
+
+def _tune_sqlite(conn):
+    """Trade durability for speed on a test-only connection"""
+    conn.executescript('''
+        PRAGMA journal_mode=MEMORY;
+        PRAGMA synchronous=OFF;
+        PRAGMA temp_store=MEMORY;
+        PRAGMA cache_size=-32000;
+    ''')
+
+
+class _SavepointConnection:
+    """Shared connection whose commit/close are deferred to the fixture"""
+    
+    def __init__(self, conn):
+        self._conn = conn
+    
+    def commit(self):
+        pass
     
-    yield db_path
+    def executescript(self, script):
+        # sqlite3's executescript commits first, which would release the
+        # test's savepoint; run the statements one by one inside it instead
+        for statement in script.split(';'):
+            if statement.strip():
+                self._conn.execute(statement)
     
-    # Cleanup
-    try:
-        os.unlink(db_path)
-    except:
+    def close(self):
         pass
+    
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+@pytest.fixture(scope="session")
+def _db_manager_session():
+    """Create the schema once per session in a shared in-memory database"""
+    import sqlite3
+    
+    db_uri = f"file:sessiondb_{_WORKER}_{uuid.uuid4().hex}?mode=memory&cache=shared"
+    conn = sqlite3.connect(db_uri, uri=True, check_same_thread=False,
+                           detect_types=sqlite3.PARSE_DECLTYPES)
+    manager = _load_uptime_bot().DatabaseManager(db_uri)
+    manager.connect = lambda: _SavepointConnection(conn)
+    if FAST_SQLITE:
+        _tune_sqlite(conn)
+    yield manager, conn
+    manager.close()
+    conn.close()
 
 
 @pytest.fixture
-def db_manager(temp_db):
-    """Create a DatabaseManager instance with temporary database"""
-    return DatabaseManager(temp_db)
+def db_manager(request, _db_manager_session):
+    """DatabaseManager whose writes are rolled back after each test
+    
+    Tests marked ``writable_db`` get a fresh file-backed database instead,
+    with real commits visible across connections and threads.
+    """
+    if request.node.get_closest_marker('writable_db'):
+        manager = _load_uptime_bot().DatabaseManager(request.getfixturevalue('temp_db_file'))
+        yield manager
+        manager.close()
+        return
+    
+    manager, conn = _db_manager_session
+    conn.execute("SAVEPOINT test_sp")
+    yield manager
+    conn.execute("ROLLBACK TO SAVEPOINT test_sp")
+    conn.execute("RELEASE SAVEPOINT test_sp")
 
 
 @pytest.fixture
 def analyzer(db_manager):
     """Create an OutageAnalyzer instance"""
-    return OutageAnalyzer(db_manager)
+    return _load_uptime_bot().OutageAnalyzer(db_manager)
+
+
+@pytest.fixture(scope="session")
+def _mock_telegram_bot_session():
+    """Patch the Telegram Bot class once per session"""
+    from unittest.mock import patch
+    
+    _load_uptime_bot()
+    with ExitStack() as stack:
+        yield stack.enter_context(patch('uptime_bot.Bot'))
 
 
 @pytest.fixture
-def mock_telegram_bot():
+def mock_telegram_bot(_mock_telegram_bot_session):
     """Mock Telegram bot to prevent actual messages"""
-    with patch('uptime_bot.Bot') as mock_bot:
-        mock_instance = MagicMock()
-        mock_bot.return_value = mock_instance
-        yield mock_instance
+    from unittest.mock import MagicMock
+    
+    mock_bot = _mock_telegram_bot_session
+    mock_bot.reset_mock(return_value=True, side_effect=True)
+    mock_instance = MagicMock()
+    mock_bot.return_value = mock_instance
+    yield mock_instance
 
 
 @pytest.fixture
 def notifier(db_manager, mock_telegram_bot):
     """Create a TelegramNotifier with mocked bot"""
+    from unittest.mock import patch
+    
     with patch.dict(os.environ, {
         'TELEGRAM_BOT_TOKEN': 'test_token',
         'TELEGRAM_CHAT_ID': 'test_chat'
     }):
-        return TelegramNotifier(db_manager, mock_telegram_bot)
+        return _load_uptime_bot().TelegramNotifier(db_manager, mock_telegram_bot)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _app_environment():
+    """Provide the bot's required settings for the whole session
+    
+    ``CONFIG`` is built when the module is imported, which may already have
+    happened at collection time; pin its database to memory as well so nothing
+    in the suite reaches the on-disk default.
+    """
+    from unittest.mock import patch
+    
+    with ExitStack() as stack:
+        stack.enter_context(patch.dict(os.environ, _TEST_ENV))
+        if "uptime_bot" in sys.modules:
+            stack.enter_context(patch.dict(sys.modules["uptime_bot"].CONFIG,
+                                           {'DB_PATH': ':memory:'}))
+        yield
+
+
+@pytest.fixture(scope="session")
+def _flask_client(uptime_bot_module):
+    """Create the Flask test client once per session
+    
+    Each request the client makes pushes and pops its own context, so the
+    same client is safe to share between tests.
+    """
+    app = uptime_bot_module.app
+    app.config['TESTING'] = True
+    return app.test_client()
 
 
 @pytest.fixture
-def flask_app():
-    """Create Flask test client"""
-    with patch.dict(os.environ, {
-        'TELEGRAM_BOT_TOKEN': 'test_token',
-        'TELEGRAM_CHAT_ID': 'test_chat',
-        'DB_PATH': ':memory:'
-    }):
-        from uptime_bot import app
-        app.config['TESTING'] = True
-        with app.test_client() as client:
-            yield client
+def flask_app(_flask_client, db_manager, monkeypatch):
+    """Session Flask test client bound to the test's database
+    
+    The webhook handler reads the module-level ``db_manager``; point it at the
+    test's DatabaseManager so requests share its pooled connection and its
+    writes are rolled back with the test's savepoint.
+    """
+    monkeypatch.setattr(_load_uptime_bot(), 'db_manager', db_manager)
+    return _flask_client
 
 
 @pytest.fixture
 def sample_events():
     """Factory for creating sample monitor events"""
+    from tests.fixtures.event_factory import next_timestamp
+    
+    MonitorEvent = _load_uptime_bot().MonitorEvent
+    
     def create_event(monitor_name, status, timestamp=None, response_time=20.0):
         if timestamp is None:
-            timestamp = datetime.now()
+            timestamp = next_timestamp()
         return MonitorEvent(
             monitor_name=monitor_name,
             status=status,
@@ -101,18 +266,19 @@ def sample_events():
 
 @pytest.fixture
 def webhook_payload_factory():
-    """Factory for creating Uptime Kuma webhook payloads"""
-    def create_payload(monitor_name="Test Monitor", status="down", 
-                      timestamp=None, response_time=50.0):
-        if timestamp is None:
-            timestamp = datetime.now().isoformat()
-        
+    """Factory for creating Uptime Kuma webhook payloads
+    
+    Payloads are built from a cached JSON template per (monitor, status,
+    response time).
+    """
+    @functools.lru_cache(maxsize=256)
+    def _template(monitor_name, status, response_time):
         status_code = 0 if status == "down" else 1
         
-        return {
+        return json.dumps({
             "heartbeat": {
                 "status": status_code,
-                "time": timestamp,
+                "time": None,
                 "ping": response_time,
                 "msg": f"{monitor_name} is {status}"
             },
@@ -121,22 +287,57 @@ def webhook_payload_factory():
                 "type": "ping" if "192.168" in monitor_name else "http"
             },
             "msg": f"[{monitor_name}] is {status}"
-        }
+        })
+    
+    def create_payload(monitor_name="Test Monitor", status="down", 
+                      timestamp=None, response_time=50.0):
+        if timestamp is None:
+            timestamp = datetime.now().isoformat()
+        
+        payload = json.loads(_template(monitor_name, status, response_time))
+        payload['heartbeat']['time'] = timestamp
+        return payload
     return create_payload
 
 
+@pytest.fixture(autouse=True)
+def _default_timestamps():
+    """Restart default event timestamps for each test
+    
+    Nothing to reset until some test has imported the event factory.
+    """
+    event_factory = sys.modules.get("tests.fixtures.event_factory")
+    if event_factory is not None:
+        event_factory.reset_timestamps()
+
+
 @pytest.fixture(autouse=True)
 def reset_environment():
-    """Reset environment variables for each test"""
-    original_env = os.environ.copy()
+    """Reset environment variables drifted by each test"""
+    snapshot = dict(os.environ)
     yield
-    os.environ.clear()
-    os.environ.update(original_env)
+    for key in set(os.environ) - snapshot.keys():
+        del os.environ[key]
+    for key, value in snapshot.items():
+        if os.environ.get(key) != value:
+            os.environ[key] = value
+
+
+@pytest.fixture(scope="session")
+def _mock_telegram_send_session():
+    """Patch the telegram send_message method once per session"""
+    from unittest.mock import patch
+    
+    with ExitStack() as stack:
+        yield stack.enter_context(patch('telegram.Bot.send_message'))
 
 
 @pytest.fixture
-def mock_telegram_send():
+def mock_telegram_send(_mock_telegram_send_session):
     """Mock the telegram send_message method"""
-    with patch('telegram.Bot.send_message') as mock_send:
-        mock_send.return_value = MagicMock(message_id=123)
-        yield mock_send
\ No newline at end of file
+    from unittest.mock import MagicMock
+    
+    mock_send = _mock_telegram_send_session
+    mock_send.reset_mock(return_value=True, side_effect=True)
+    mock_send.return_value = MagicMock(message_id=123)
+    yield mock_send
\ No newline at end of file
@@ -1,9 +1,68 @@
 """
 Event factory for generating test data
 """
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+import functools
+import heapq
+import itertools
+import operator
 import random
+import sys
+import threading
+
+import numpy as np
+
+_RNG = np.random.default_rng()
+
+_UP, _DOWN = sys.intern('up'), sys.intern('down')
+
+# Default timestamps: the clock, real or frozen, is read once per test and
+# later defaults step forward from it by a microsecond counter, so they are
+# strictly ordered without a clock read or lock per call
+_base_timestamp = None
+_base_lock = threading.Lock()
+_ticks = itertools.count()
+
+
+def reset_timestamps() -> None:
+    """Start the next default timestamp from the clock again; run before every test"""
+    global _base_timestamp, _ticks
+    with _base_lock:
+        _base_timestamp = None
+        _ticks = itertools.count()
+
+
+def next_timestamp() -> datetime:
+    """Return the test's base time plus the next microsecond tick"""
+    global _base_timestamp
+    if _base_timestamp is None:
+        with _base_lock:
+            if _base_timestamp is None:
+                _base_timestamp = datetime.now()
+    return _base_timestamp + timedelta(microseconds=next(_ticks))
+
+
+@dataclass(slots=True, frozen=True)
+class TestEvent:
+    """A generated monitor event
+    
+    Exposes the same attributes as MonitorEvent, so it can be passed straight
+    to DatabaseManager.add_event. Slotted instances carry no per-object
+    __dict__, which keeps long generated sequences compact.
+    """
+    __test__ = False  # not a pytest test class
+    
+    monitor_name: str
+    status: str
+    timestamp: datetime
+    message: str
+    response_time: float
+    
+    def __getitem__(self, key: str):
+        """Dict-style field access for existing callers"""
+        return getattr(self, key)
 
 
 class EventFactory:
@@ -17,162 +76,186 @@ class EventFactory:
         'site_cloudflare': 'Cloudflare',
         'site_wikipedia': 'Wikipedia'
     }
+    # Interned so repeated names compare by identity in dicts and sets
+    MONITORS = {key: sys.intern(name) for key, name in MONITORS.items()}
+    _MONITORS_TUPLE = tuple(MONITORS.values())
+    
+    # Formatted "<monitor> is <status>" messages, reused across events
+    _MSG_CACHE: Dict[Tuple[str, str], str] = {}
+    
+    @classmethod
+    def _message(cls, monitor_name: str, status: str) -> str:
+        """Return the cached status message for a monitor"""
+        message = cls._MSG_CACHE.get((monitor_name, status))
+        if message is None:
+            message = cls._MSG_CACHE[(monitor_name, status)] = f"{monitor_name} is {status}"
+        return message
     
     @classmethod
     def create_event(cls, monitor_name: str, status: str, 
                     timestamp: Optional[datetime] = None,
-                    response_time: Optional[float] = None) -> Dict:
+                    response_time: Optional[float] = None) -> TestEvent:
         """Create a single event"""
         if timestamp is None:
-            timestamp = datetime.now()
+            timestamp = next_timestamp()
         
         if response_time is None:
-            response_time = random.uniform(10, 100) if status == 'up' else 0
-        
-        return {
-            'monitor_name': monitor_name,
-            'status': status,
-            'timestamp': timestamp,
-            'message': f"{monitor_name} is {status}",
-            'response_time': response_time
-        }
+            response_time = random.uniform(10, 100) if status == _UP else 0
+        
+        return TestEvent(
+            monitor_name=monitor_name,
+            status=status,
+            timestamp=timestamp,
+            message=cls._message(monitor_name, status),
+            response_time=response_time
+        )
     
     @classmethod
-    def router_restart_sequence(cls, start_time: datetime, 
-                               recovery_seconds: int = 25) -> List[Dict]:
+    def create_events_bulk(cls, monitors: List[str], statuses: List[str],
+                           offsets_s: List[float], base_time: datetime) -> List[TestEvent]:
+        """Create many events in one pass from parallel field lists
+        
+        Offsets are plain seconds from ``base_time``; each is turned into a
+        datetime exactly once, with no running datetime arithmetic.
+        """
+        timestamps = [base_time + timedelta(seconds=float(o)) for o in offsets_s]
+        response_times = _RNG.uniform(10, 100, len(timestamps)).tolist()
+        return [
+            TestEvent(monitor, status, timestamp, cls._message(monitor, status),
+                      response_time if status == _UP else 0)
+            for monitor, status, timestamp, response_time
+            in zip(monitors, statuses, timestamps, response_times)
+        ]
+    
+    # The scenario sequences below are memoized on their arguments: the same
+    # frozen start time recurs across tests, and the frozen events are shared
+    # as read-only tuples, so callers must copy before modifying one. Their
+    # random parts are drawn from a generator seeded with the arguments, so a
+    # cached result is the one any call would build. They are static methods
+    # so the cache holds no reference to EventFactory subclasses.
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=128)
+    def router_restart_sequence(start_time: datetime, 
+                               recovery_seconds: int = 25) -> Tuple[TestEvent, ...]:
         """Generate events for a router restart scenario"""
+        factory = EventFactory
+        rng = random.Random(f"router_restart/{start_time.isoformat()}/{recovery_seconds}")
         events = []
         
         # Router goes down
-        events.append(cls.create_event(
-            cls.MONITORS['router'], 'down', start_time
+        events.append(factory.create_event(
+            factory.MONITORS['router'], _DOWN, start_time
         ))
         
         # External services detect down shortly after
         for i, monitor in enumerate(['dns_google', 'dns_cloudflare']):
-            events.append(cls.create_event(
-                cls.MONITORS[monitor], 'down', 
+            events.append(factory.create_event(
+                factory.MONITORS[monitor], _DOWN, 
                 start_time + timedelta(seconds=2 + i)
             ))
         
         # Router comes back up quickly
-        events.append(cls.create_event(
-            cls.MONITORS['router'], 'up',
-            start_time + timedelta(seconds=recovery_seconds)
+        events.append(factory.create_event(
+            factory.MONITORS['router'], _UP,
+            start_time + timedelta(seconds=recovery_seconds),
+            response_time=rng.uniform(10, 100)
         ))
         
         # Services recover shortly after
         for i, monitor in enumerate(['dns_google', 'dns_cloudflare']):
-            events.append(cls.create_event(
-                cls.MONITORS[monitor], 'up',
-                start_time + timedelta(seconds=recovery_seconds + 2 + i)
+            events.append(factory.create_event(
+                factory.MONITORS[monitor], _UP,
+                start_time + timedelta(seconds=recovery_seconds + 2 + i),
+                response_time=rng.uniform(10, 100)
             ))
         
-        return events
+        return tuple(events)
     
-    @classmethod
-    def power_outage_sequence(cls, start_time: datetime) -> List[Dict]:
+    @staticmethod
+    @functools.lru_cache(maxsize=128)
+    def power_outage_sequence(start_time: datetime) -> Tuple[TestEvent, ...]:
         """Generate events for a power outage"""
-        events = []
-        
-        # All services go down simultaneously
-        for monitor in cls.MONITORS.values():
-            events.append(cls.create_event(
-                monitor, 'down', start_time
-            ))
-        
-        return events
+        # All services go down simultaneously; down events carry no response time
+        monitors = EventFactory._MONITORS_TUPLE
+        n = len(monitors)
+        return tuple(EventFactory.create_events_bulk(monitors, [_DOWN] * n, [0] * n, start_time))
     
-    @classmethod
-    def isp_outage_sequence(cls, start_time: datetime) -> List[Dict]:
+    @staticmethod
+    @functools.lru_cache(maxsize=128)
+    def isp_outage_sequence(start_time: datetime) -> Tuple[TestEvent, ...]:
         """Generate events for an ISP outage"""
+        factory = EventFactory
+        rng = random.Random(f"isp_outage/{start_time.isoformat()}")
         events = []
         
         # Router stays up
-        events.append(cls.create_event(
-            cls.MONITORS['router'], 'up', start_time
+        events.append(factory.create_event(
+            factory.MONITORS['router'], _UP, start_time,
+            response_time=rng.uniform(10, 100)
         ))
         
         # But external services are down
         for monitor in ['dns_google', 'dns_cloudflare', 'site_google']:
-            events.append(cls.create_event(
-                cls.MONITORS[monitor], 'down',
-                start_time + timedelta(seconds=random.randint(1, 5))
+            events.append(factory.create_event(
+                factory.MONITORS[monitor], _DOWN,
+                start_time + timedelta(seconds=rng.randint(1, 5))
             ))
         
-        return events
+        return tuple(events)
     
     @classmethod
     def flapping_sequence(cls, start_time: datetime, 
                          monitor_name: str,
                          flap_count: int = 3,
-                         interval_seconds: int = 30) -> List[Dict]:
+                         interval_seconds: int = 30) -> List[TestEvent]:
         """Generate events for a flapping service"""
-        events = []
-        current_time = start_time
-        
-        for i in range(flap_count):
-            # Service goes down
-            events.append(cls.create_event(
-                monitor_name, 'down', current_time
-            ))
-            current_time += timedelta(seconds=interval_seconds)
-            
-            # Service comes back up
-            events.append(cls.create_event(
-                monitor_name, 'up', current_time
-            ))
-            current_time += timedelta(seconds=interval_seconds)
-        
-        return events
+        # Alternating down/up transitions, one every interval_seconds
+        n = 2 * flap_count
+        return cls.create_events_bulk([monitor_name] * n, [_DOWN, _UP] * flap_count,
+                                      [i * interval_seconds for i in range(n)],
+                                      start_time)
     
     @classmethod
-    def partial_recovery_sequence(cls, start_time: datetime) -> List[Dict]:
+    def partial_recovery_sequence(cls, start_time: datetime) -> List[TestEvent]:
         """Generate events for partial recovery after outage"""
-        events = []
-        
         # All services go down
-        for monitor in cls.MONITORS.values():
-            events.append(cls.create_event(
-                monitor, 'down', start_time
-            ))
+        monitors = list(cls._MONITORS_TUPLE)
+        statuses = [_DOWN] * len(monitors)
+        offsets = [0] * len(monitors)
         
         # Only some recover within grace period
-        recovery_time = start_time + timedelta(seconds=60)
         for monitor in ['router', 'dns_google']:
-            events.append(cls.create_event(
-                cls.MONITORS[monitor], 'up', recovery_time
-            ))
+            monitors.append(cls.MONITORS[monitor])
+            statuses.append(_UP)
+            offsets.append(60)
         
         # Others recover much later
-        late_recovery = start_time + timedelta(seconds=300)
         for monitor in ['dns_cloudflare', 'site_google']:
-            events.append(cls.create_event(
-                cls.MONITORS[monitor], 'up', late_recovery
-            ))
+            monitors.append(cls.MONITORS[monitor])
+            statuses.append(_UP)
+            offsets.append(300)
         
-        return events
+        return cls.create_events_bulk(monitors, statuses, offsets, start_time)
     
     @classmethod
-    def interleaved_outages_sequence(cls, start_time: datetime) -> List[Dict]:
+    def interleaved_outages_sequence(cls, start_time: datetime) -> List[TestEvent]:
         """Generate events for interleaved independent outages"""
-        events = []
-        
-        # First, an external service fails
-        events.append(cls.create_event(
-            cls.MONITORS['site_wikipedia'], 'down', start_time
-        ))
+        # First an external service fails, and recovers much later
+        site_events = cls.create_events_bulk(
+            [cls.MONITORS['site_wikipedia']] * 2, [_DOWN, _UP], [0, 600], start_time
+        )
         
-        # Then router restart happens
+        # Then router restart happens in between
         router_events = cls.router_restart_sequence(
             start_time + timedelta(seconds=60)
         )
-        events.extend(router_events)
-        
-        # Original service recovers much later
-        events.append(cls.create_event(
-            cls.MONITORS['site_wikipedia'], 'up',
-            start_time + timedelta(seconds=600)
-        ))
         
-        return sorted(events, key=lambda x: x['timestamp'])
\ No newline at end of file
+        # Both pieces are already in timestamp order, so a linear merge suffices
+        return list(heapq.merge(site_events, router_events,
+                                key=operator.attrgetter('timestamp')))
+
+
+def load_events(db_manager, events: List[TestEvent]) -> None:
+    """Insert events with a single executemany in one transaction"""
+    db_manager.add_events(events)
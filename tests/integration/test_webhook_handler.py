@@ -3,26 +3,97 @@ Integration tests for webhook handler
 Tests payload parsing, validation, error handling, and concurrent processing
 """
 import pytest
+import asyncio
+import functools
 import json
+import random
 import threading
 import time
-from datetime import datetime, timedelta
-from unittest.mock import patch, MagicMock
 from concurrent.futures import ThreadPoolExecutor
-import os
-import sys
+from datetime import datetime, timedelta
+from unittest.mock import patch, MagicMock, AsyncMock
+
+import httpx
+import numpy as np
+
+try:
+    import orjson
+    
+    def _dumps(obj):
+        return orjson.dumps(obj)
+    
+    def _loads(data):
+        return orjson.loads(data)
+except ImportError:
+    _dumps = json.dumps
+    _loads = json.loads
 
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-import importlib.util
-spec = importlib.util.spec_from_file_location("uptime_bot", "uptime-telegram-bot.py")
-uptime_bot = importlib.util.module_from_spec(spec)
-sys.modules["uptime_bot"] = uptime_bot
-spec.loader.exec_module(uptime_bot)
+# Fixed heartbeat time for the loop-heavy tests; the handler stamps events with
+# its own clock, so this only keeps the request bodies identical across runs
+_FROZEN_TIME = datetime(2024, 1, 1, 12, 0, 0).isoformat()
 
-from uptime_bot import app, DatabaseManager, OutageAnalyzer, TelegramNotifier
 
+def _encode(body):
+    """Return a serialized payload as bytes (orjson already yields bytes)"""
+    return body if isinstance(body, bytes) else body.encode()
 
+
+@functools.lru_cache(maxsize=512)
+def _body(status, name, msg, url="https://test.com", mtype="http", ping=20.0,
+          t=None, summary=None):
+    """Serialized webhook body, cached per distinct set of fields"""
+    return _encode(_dumps({
+        "heartbeat": {
+            "status": status,
+            "time": t or _FROZEN_TIME,
+            "ping": ping,
+            "msg": msg
+        },
+        "monitor": {
+            "name": name,
+            "type": mtype,
+            "url": url
+        },
+        "msg": summary if summary is not None else f"[{name}] {msg}"
+    }))
+
+
+class _AsyncWSGITransport(httpx.AsyncBaseTransport):
+    """Serve an httpx.AsyncClient from a WSGI app in-process
+    
+    httpx only ships a synchronous WSGI transport; this runs it on a single
+    worker thread, as a WSGI server would, so the app never sees the client's
+    event loop. Each request is handled to completion before the next one
+    starts: requests gathered through it are sequential, not concurrent.
+    """
+    
+    def __init__(self, app):
+        self._transport = httpx.WSGITransport(app=app)
+        self._worker = ThreadPoolExecutor(max_workers=1)
+    
+    async def handle_async_request(self, request):
+        await request.aread()
+        response = await asyncio.get_running_loop().run_in_executor(
+            self._worker, self._transport.handle_request, request)
+        return httpx.Response(response.status_code, headers=response.headers,
+                              content=response.read())
+    
+    async def aclose(self):
+        self._worker.shutdown()
+
+
+async def _post(client, body):
+    return await client.post('/webhook', content=body,
+                             headers={'content-type': 'application/json'})
+
+
+def _async_client(flask_app):
+    return httpx.AsyncClient(transport=_AsyncWSGITransport(flask_app.application),
+                             base_url='http://testserver')
+
+
+@pytest.mark.xdist_group("parse")
 class TestWebhookPayloadParsing:
     """Test parsing of Uptime Kuma webhook payloads"""
     
@@ -44,11 +115,11 @@ class TestWebhookPayloadParsing:
         }
         
         response = flask_app.post('/webhook',
-                                 data=json.dumps(valid_payload),
+                                 data=_dumps(valid_payload),
                                  content_type='application/json')
         
         assert response.status_code == 200
-        response_data = json.loads(response.data)
+        response_data = _loads(response.data)
         assert response_data['status'] == 'success'
         assert 'event_id' in response_data or 'message' in response_data
     
@@ -70,43 +141,41 @@ class TestWebhookPayloadParsing:
         }
         
         response = flask_app.post('/webhook',
-                                 data=json.dumps(up_payload),
+                                 data=_dumps(up_payload),
                                  content_type='application/json')
         
         assert response.status_code == 200
-        response_data = json.loads(response.data)
+        response_data = _loads(response.data)
         assert response_data['status'] == 'success'
     
-    def test_multiple_monitor_types(self, flask_app):
+    @pytest.mark.parametrize("monitor_type,url,name", [
+        ("ping", "192.168.1.1", "Router"),
+        ("http", "https://google.com", "Google"),
+        ("tcp", "8.8.8.8:53", "DNS Server"),
+        ("keyword", "https://example.com", "Website"),
+    ])
+    def test_multiple_monitor_types(self, flask_app, monitor_type, url, name):
         """Test different monitor types (ping, http, tcp, etc.)"""
-        monitor_types = [
-            ("ping", "192.168.1.1", "Router"),
-            ("http", "https://google.com", "Google"),
-            ("tcp", "8.8.8.8:53", "DNS Server"),
-            ("keyword", "https://example.com", "Website"),
-        ]
+        payload = {
+            "heartbeat": {
+                "status": 1,
+                "time": datetime.now().isoformat(),
+                "ping": 30.0,
+                "msg": "OK"
+            },
+            "monitor": {
+                "name": name,
+                "type": monitor_type,
+                "url": url
+            },
+            "msg": f"[{name}] is up"
+        }
         
-        for monitor_type, url, name in monitor_types:
-            payload = {
-                "heartbeat": {
-                    "status": 1,
-                    "time": datetime.now().isoformat(),
-                    "ping": 30.0,
-                    "msg": "OK"
-                },
-                "monitor": {
-                    "name": name,
-                    "type": monitor_type,
-                    "url": url
-                },
-                "msg": f"[{name}] is up"
-            }
-            
-            response = flask_app.post('/webhook',
-                                     data=json.dumps(payload),
-                                     content_type='application/json')
-            
-            assert response.status_code == 200
+        response = flask_app.post('/webhook',
+                                 data=_dumps(payload),
+                                 content_type='application/json')
+        
+        assert response.status_code == 200
     
     def test_payload_with_additional_fields(self, flask_app):
         """Test that extra fields in payload don't break parsing"""
@@ -131,12 +200,25 @@ class TestWebhookPayloadParsing:
         }
         
         response = flask_app.post('/webhook',
-                                 data=json.dumps(payload_with_extras),
+                                 data=_dumps(payload_with_extras),
                                  content_type='application/json')
         
         assert response.status_code == 200
+    
+    def test_array_body_rejected(self, flask_app, db_manager):
+        """Test that a JSON array is a bad request, as Uptime Kuma never sends one"""
+        batch = [_loads(_body(0, name, f"{name} is down", ping=0))
+                 for name in ["Router 192.168.1.1", "Google DNS"]]
+        
+        response = flask_app.post('/webhook',
+                                 data=_dumps(batch),
+                                 content_type='application/json')
+        
+        assert response.status_code == 400
+        assert db_manager.get_recent_events(5) == []
 
 
+@pytest.mark.xdist_group("parse")
 class TestWebhookErrorHandling:
     """Test error handling for malformed or invalid payloads"""
     
@@ -149,28 +231,26 @@ class TestWebhookErrorHandling:
                                  content_type='application/json')
         
         assert response.status_code == 400
-        response_data = json.loads(response.data)
+        response_data = _loads(response.data)
         assert 'error' in response_data
     
-    def test_missing_required_fields(self, flask_app):
+    @pytest.mark.parametrize("invalid_payload", [
+        # Missing heartbeat
+        {"monitor": {"name": "Test"}, "msg": "test"},
+        # Missing monitor
+        {"heartbeat": {"status": 1, "time": "2024-01-01T12:00:00Z"}, "msg": "test"},
+        # Missing status in heartbeat
+        {"heartbeat": {"time": "2024-01-01T12:00:00Z"}, "monitor": {"name": "Test"}},
+        # Missing monitor name
+        {"heartbeat": {"status": 1, "time": "2024-01-01T12:00:00Z"}, "monitor": {"type": "http"}},
+    ])
+    def test_missing_required_fields(self, flask_app, invalid_payload):
         """Test handling of payloads missing required fields"""
-        test_cases = [
-            # Missing heartbeat
-            {"monitor": {"name": "Test"}, "msg": "test"},
-            # Missing monitor
-            {"heartbeat": {"status": 1, "time": "2024-01-01T12:00:00Z"}, "msg": "test"},
-            # Missing status in heartbeat
-            {"heartbeat": {"time": "2024-01-01T12:00:00Z"}, "monitor": {"name": "Test"}},
-            # Missing monitor name
-            {"heartbeat": {"status": 1, "time": "2024-01-01T12:00:00Z"}, "monitor": {"type": "http"}},
-        ]
+        response = flask_app.post('/webhook',
+                                 data=_dumps(invalid_payload),
+                                 content_type='application/json')
         
-        for invalid_payload in test_cases:
-            response = flask_app.post('/webhook',
-                                     data=json.dumps(invalid_payload),
-                                     content_type='application/json')
-            
-            assert response.status_code in [400, 422]  # Bad request or unprocessable
+        assert response.status_code in [400, 422]  # Bad request or unprocessable
     
     def test_invalid_field_types(self, flask_app):
         """Test handling of incorrect field types"""
@@ -189,7 +269,7 @@ class TestWebhookErrorHandling:
         }
         
         response = flask_app.post('/webhook',
-                                 data=json.dumps(invalid_type_payload),
+                                 data=_dumps(invalid_type_payload),
                                  content_type='application/json')
         
         # Should handle gracefully, either accept with conversion or reject
@@ -214,19 +294,25 @@ class TestWebhookErrorHandling:
         assert response.status_code in [400, 415]  # Bad request or unsupported media type
 
 
+@pytest.mark.xdist_group("load")
 class TestWebhookConcurrency:
     """Test concurrent webhook processing"""
     
-    def test_concurrent_webhook_requests(self, flask_app):
-        """Test handling multiple concurrent webhook requests"""
+    def test_sequential_webhook_requests(self, flask_app, uptime_bot_module, monkeypatch):
+        """Test a run of webhook requests handled one after another
+        
+        The in-process transport serves them sequentially; see
+        test_threaded_webhook_requests for concurrent handling.
+        """
+        notifier = MagicMock(send_alert=AsyncMock(), send_recovery=AsyncMock())
+        monkeypatch.setattr(uptime_bot_module, 'telegram_notifier', notifier)
         num_requests = 20
-        results = []
         
-        def send_webhook(index):
-            payload = {
+        def webhook_body(index):
+            return _dumps({
                 "heartbeat": {
                     "status": index % 2,  # Alternate between up and down
-                    "time": datetime.now().isoformat(),
+                    "time": _FROZEN_TIME,
                     "ping": 20.0 + index,
                     "msg": f"Status {index}"
                 },
@@ -236,44 +322,70 @@ class TestWebhookConcurrency:
                     "url": f"https://test{index}.com"
                 },
                 "msg": f"[Monitor_{index % 5}] status"
-            }
-            
-            response = flask_app.post('/webhook',
-                                     data=json.dumps(payload),
-                                     content_type='application/json')
-            
-            results.append({
-                'index': index,
-                'status_code': response.status_code,
-                'response': json.loads(response.data) if response.data else None
             })
         
-        # Send concurrent requests
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            futures = [executor.submit(send_webhook, i) for i in range(num_requests)]
-            for future in futures:
-                future.result()
+        async def send_webhooks():
+            async with _async_client(flask_app) as client:
+                return await asyncio.gather(
+                    *(_post(client, webhook_body(i)) for i in range(num_requests)))
+        
+        # Send the requests, keeping only (index, status, raw body)
+        results = [(index, response.status_code, response.content)
+                   for index, response in enumerate(asyncio.run(send_webhooks()))]
         
         # Verify all requests were processed
         assert len(results) == num_requests
         
-        # All should succeed
-        for result in results:
-            assert result['status_code'] == 200
-            assert result['response']['status'] == 'success'
+        # All should succeed; bodies are parsed only now, after the run
+        status_codes = np.fromiter((status_code for _, status_code, _ in results),
+                                   dtype=np.int16, count=num_requests)
+        assert (status_codes == 200).all()
+        parsed = [(index, status_code, _loads(body) if body else None)
+                  for index, status_code, body in results]
+        assert all(data['status'] == 'success' for _, _, data in parsed)
+    
+    @pytest.mark.writable_db
+    def test_threaded_webhook_requests(self, flask_app, db_manager,
+                                       uptime_bot_module, monkeypatch):
+        """Test webhooks handled concurrently from several threads
+        
+        Runs on a file-backed database so the requests go through the
+        DatabaseManager writer thread and per-thread reader connections.
+        """
+        notifier = MagicMock(send_alert=AsyncMock(), send_recovery=AsyncMock())
+        monkeypatch.setattr(uptime_bot_module, 'telegram_notifier', notifier)
+        num_threads = 8
+        per_thread = 5
+        start = threading.Barrier(num_threads)
+        
+        def send_webhooks(thread_id):
+            start.wait()
+            return [flask_app.post('/webhook',
+                                   data=_body(i % 2, f"Monitor_{thread_id}",
+                                              f"Status {i}", ping=20.0 + i),
+                                   content_type='application/json').status_code
+                    for i in range(per_thread)]
+        
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            status_codes = [code for codes in executor.map(send_webhooks, range(num_threads))
+                            for code in codes]
+        
+        assert status_codes == [200] * (num_threads * per_thread)
+        stored = db_manager.get_recent_events(5)
+        assert len(stored) == num_threads * per_thread
+        assert {e['monitor_name'] for e in stored} == {f"Monitor_{t}" for t in range(num_threads)}
     
-    def test_rapid_webhook_burst(self, flask_app):
+    @pytest.mark.benchmark
+    def test_rapid_webhook_burst(self, flask_app, benchmark):
         """Test handling rapid burst of webhooks"""
         burst_size = 50
-        burst_results = []
         
-        # Send burst of webhooks as fast as possible
-        start_time = time.time()
-        for i in range(burst_size):
-            payload = {
+        # Only the status varies, so serialize both bodies up front
+        def burst_body(status):
+            return _dumps({
                 "heartbeat": {
-                    "status": 0 if i < 25 else 1,  # Half down, half up
-                    "time": datetime.now().isoformat(),
+                    "status": status,
+                    "time": _FROZEN_TIME,
                     "ping": 15.0,
                     "msg": "Burst test"
                 },
@@ -283,22 +395,24 @@ class TestWebhookConcurrency:
                     "url": "192.168.1.1"
                 },
                 "msg": "[Burst Monitor] burst test"
-            }
-            
-            response = flask_app.post('/webhook',
-                                     data=json.dumps(payload),
-                                     content_type='application/json')
-            
-            burst_results.append(response.status_code)
+            })
+        down_body, up_body = burst_body(0), burst_body(1)
+        
+        # Send burst of webhooks as fast as possible
+        def burst():
+            burst_results = np.empty(burst_size, dtype=np.int16)
+            for i in range(burst_size):
+                response = flask_app.post('/webhook',
+                                         data=down_body if i < 25 else up_body,  # Half down, half up
+                                         content_type='application/json')
+                burst_results[i] = response.status_code
+            return burst_results
         
-        burst_duration = time.time() - start_time
+        burst_results = benchmark.pedantic(burst, rounds=5, iterations=1, warmup_rounds=1)
         
         # All requests should be handled
         assert len(burst_results) == burst_size
-        assert all(status == 200 for status in burst_results)
-        
-        # Should handle burst quickly (under 5 seconds for 50 requests)
-        assert burst_duration < 5.0
+        assert (burst_results == 200).all()
     
     def test_webhook_ordering_preservation(self, flask_app):
         """Test that webhooks are processed in order when from same monitor"""
@@ -307,25 +421,21 @@ class TestWebhookConcurrency:
         
         # Send sequence of status changes
         status_sequence = [1, 1, 0, 0, 0, 1, 1, 0, 1]  # Pattern of ups and downs
+        base_time = datetime(2024, 1, 1, 12, 0, 0)
+        times = [(base_time + timedelta(seconds=i)).isoformat()
+                 for i in range(len(status_sequence))]
+        
+        # Serialize every body before sending so the loop only posts bytes
+        bodies = [
+            _body(status, monitor_name, f"Event {i}",
+                  ping=20.0 if status == 1 else 0, t=times[i],
+                  summary=f"[{monitor_name}] event {i}")
+            for i, status in enumerate(status_sequence)
+        ]
         
-        for i, status in enumerate(status_sequence):
-            payload = {
-                "heartbeat": {
-                    "status": status,
-                    "time": (datetime.now() + timedelta(seconds=i)).isoformat(),
-                    "ping": 20.0 if status == 1 else 0,
-                    "msg": f"Event {i}"
-                },
-                "monitor": {
-                    "name": monitor_name,
-                    "type": "http",
-                    "url": "https://test.com"
-                },
-                "msg": f"[{monitor_name}] event {i}"
-            }
-            
+        for status, body in zip(status_sequence, bodies):
             response = flask_app.post('/webhook',
-                                     data=json.dumps(payload),
+                                     data=body,
                                      content_type='application/json')
             
             assert response.status_code == 200
@@ -335,6 +445,7 @@ class TestWebhookConcurrency:
         assert events == status_sequence
 
 
+@pytest.mark.xdist_group("load")
 class TestWebhookRateLimiting:
     """Test rate limiting and DoS protection"""
     
@@ -342,29 +453,33 @@ class TestWebhookRateLimiting:
         """Test rate limiting applied per monitor"""
         # Send many requests for same monitor
         monitor_name = "Rate Limited Monitor"
-        responses = []
+        num_requests = 100
+        responses = np.empty(num_requests, dtype=np.int16)
         
-        for i in range(100):
-            payload = {
-                "heartbeat": {
-                    "status": 1,
-                    "time": datetime.now().isoformat(),
-                    "ping": 20.0,
-                    "msg": f"Request {i}"
-                },
-                "monitor": {
-                    "name": monitor_name,
-                    "type": "http",
-                    "url": "https://test.com"
-                },
-                "msg": f"[{monitor_name}] request {i}"
-            }
-            
+        # Serialize once and splice the request index into each body
+        template = _encode(_dumps({
+            "heartbeat": {
+                "status": 1,
+                "time": _FROZEN_TIME,
+                "ping": 20.0,
+                "msg": "Request __IDX__"
+            },
+            "monitor": {
+                "name": monitor_name,
+                "type": "http",
+                "url": "https://test.com"
+            },
+            "msg": f"[{monitor_name}] request __IDX__"
+        }))
+        bodies = [template.replace(b"__IDX__", str(i).encode())
+                  for i in range(num_requests)]
+        
+        for i, body in enumerate(bodies):
             response = flask_app.post('/webhook',
-                                     data=json.dumps(payload),
+                                     data=body,
                                      content_type='application/json')
             
-            responses.append(response.status_code)
+            responses[i] = response.status_code
             
             # Small delay to avoid overwhelming
             if i % 10 == 0:
@@ -372,214 +487,170 @@ class TestWebhookRateLimiting:
         
         # Check if rate limiting kicked in (if implemented)
         # Should either all succeed (200) or some get rate limited (429)
-        assert all(code in [200, 429] for code in responses)
+        assert np.isin(responses, (200, 429)).all()
     
-    def test_ddos_protection(self, flask_app):
-        """Test protection against DDoS-like webhook floods"""
+    def test_ddos_flood_throughput(self, flask_app):
+        """Test a DDoS-like webhook flood, served sequentially in-process
+        
+        The sources are interleaved on one event loop but each request is
+        handled to completion before the next; this checks throughput and
+        429 handling, not concurrent request handling.
+        """
         flood_size = 200
-        flood_threads = 20
-        responses = []
-        lock = threading.Lock()
-        
-        def flood_webhooks(thread_id):
-            for i in range(flood_size // flood_threads):
-                payload = {
-                    "heartbeat": {
-                        "status": 1,
-                        "time": datetime.now().isoformat(),
-                        "ping": 10.0,
-                        "msg": f"Flood {thread_id}-{i}"
-                    },
-                    "monitor": {
-                        "name": f"Flood Monitor {thread_id}",
-                        "type": "ping",
-                        "url": "192.168.1.1"
-                    },
-                    "msg": f"Flood test {thread_id}-{i}"
-                }
-                
-                try:
-                    response = flask_app.post('/webhook',
-                                            data=json.dumps(payload),
-                                            content_type='application/json')
-                    
-                    with lock:
-                        responses.append(response.status_code)
-                except:
-                    with lock:
-                        responses.append(500)  # Connection error
+        flood_sources = 20
+        
+        def flood_template(source_id):
+            # Per-source body with the source id baked in; only the index varies
+            return _encode(_dumps({
+                "heartbeat": {
+                    "status": 1,
+                    "time": _FROZEN_TIME,
+                    "ping": 10.0,
+                    "msg": f"Flood {source_id}-__IDX__"
+                },
+                "monitor": {
+                    "name": f"Flood Monitor {source_id}",
+                    "type": "ping",
+                    "url": "192.168.1.1"
+                },
+                "msg": f"Flood test {source_id}-__IDX__"
+            }))
+        
+        async def flood_webhooks():
+            limit = asyncio.Semaphore(flood_sources)
+            
+            async def send(body):
+                async with limit:
+                    try:
+                        # Back off with jitter on 429 so retries don't arrive
+                        # in lockstep and skew the success rate
+                        for attempt in range(4):
+                            status_code = (await _post(client, body)).status_code
+                            if status_code != 429:
+                                break
+                            await asyncio.sleep(random.uniform(2 ** attempt * 0.01,
+                                                               2 ** attempt * 0.03))
+                        return status_code
+                    except Exception:
+                        return 500  # Connection error
+            
+            async def flood_source(source_id):
+                # Each source collects into its own buffer; merged once below
+                template = flood_template(source_id)
+                local = []
+                for i in range(flood_size // flood_sources):
+                    local.append(await send(template.replace(b"__IDX__", str(i).encode())))
+                return local
+            
+            async with _async_client(flask_app) as client:
+                return await asyncio.gather(*map(flood_source, range(flood_sources)))
         
         # Launch flood
-        with ThreadPoolExecutor(max_workers=flood_threads) as executor:
-            futures = [executor.submit(flood_webhooks, i) for i in range(flood_threads)]
-            for future in futures:
-                future.result()
+        responses = np.array([code for local in asyncio.run(flood_webhooks()) for code in local],
+                             dtype=np.int16)
         
         # System should survive the flood
         assert len(responses) > 0
         # Most requests should be handled (even if rate limited)
-        success_rate = sum(1 for r in responses if r in [200, 429]) / len(responses)
+        success_rate = np.isin(responses, (200, 429)).mean()
         assert success_rate > 0.8  # At least 80% handled properly
 
 
+@pytest.mark.xdist_group("parse")
 class TestWebhookSecurity:
     """Test security aspects of webhook handler"""
     
-    def test_sql_injection_attempt(self, flask_app):
+    @pytest.mark.parametrize("injection", [
+        "'; DROP TABLE events; --",
+        "' OR '1'='1",
+        "'; DELETE FROM events WHERE '1'='1",
+        "UNION SELECT * FROM users",
+    ])
+    def test_sql_injection_attempt(self, flask_app, injection):
         """Test that SQL injection attempts are handled safely"""
-        injection_payloads = [
-            "'; DROP TABLE events; --",
-            "' OR '1'='1",
-            "'; DELETE FROM events WHERE '1'='1",
-            "UNION SELECT * FROM users",
-        ]
+        body = _body(1, injection, injection, t="2024-01-01T12:00:00Z", summary=injection)
         
-        for injection in injection_payloads:
-            payload = {
-                "heartbeat": {
-                    "status": 1,
-                    "time": "2024-01-01T12:00:00Z",
-                    "ping": 20.0,
-                    "msg": injection
-                },
-                "monitor": {
-                    "name": injection,
-                    "type": "http",
-                    "url": "https://test.com"
-                },
-                "msg": injection
-            }
-            
-            response = flask_app.post('/webhook',
-                                     data=json.dumps(payload),
-                                     content_type='application/json')
-            
-            # Should handle safely without SQL errors
-            assert response.status_code in [200, 400]
+        response = flask_app.post('/webhook',
+                                 data=body,
+                                 content_type='application/json')
+        
+        # Should handle safely without SQL errors
+        assert response.status_code in [200, 400]
     
-    def test_xss_prevention(self, flask_app):
+    @pytest.mark.parametrize("xss", [
+        "<script>alert('XSS')</script>",
+        "<img src=x onerror=alert('XSS')>",
+        "javascript:alert('XSS')",
+        "<iframe src='evil.com'></iframe>",
+    ])
+    def test_xss_prevention(self, flask_app, xss):
         """Test that XSS attempts in payloads are handled"""
-        xss_payloads = [
-            "<script>alert('XSS')</script>",
-            "<img src=x onerror=alert('XSS')>",
-            "javascript:alert('XSS')",
-            "<iframe src='evil.com'></iframe>",
-        ]
+        body = _body(1, f"Monitor {xss}", xss, t="2024-01-01T12:00:00Z", summary=xss)
         
-        for xss in xss_payloads:
-            payload = {
-                "heartbeat": {
-                    "status": 1,
-                    "time": "2024-01-01T12:00:00Z",
-                    "ping": 20.0,
-                    "msg": xss
-                },
-                "monitor": {
-                    "name": f"Monitor {xss}",
-                    "type": "http",
-                    "url": "https://test.com"
-                },
-                "msg": xss
-            }
-            
-            response = flask_app.post('/webhook',
-                                     data=json.dumps(payload),
-                                     content_type='application/json')
-            
-            # Should accept but sanitize
-            assert response.status_code == 200
-            
-            # Response should not reflect XSS
-            response_text = response.data.decode('utf-8')
-            assert '<script>' not in response_text
-            assert 'javascript:' not in response_text
+        response = flask_app.post('/webhook',
+                                 data=body,
+                                 content_type='application/json')
+        
+        # Should accept but sanitize
+        assert response.status_code == 200
+        
+        # Response should not reflect XSS
+        assert b'<script>' not in response.data
+        assert b'javascript:' not in response.data
     
-    def test_path_traversal_attempt(self, flask_app):
+    @pytest.mark.parametrize("attempt", [
+        "../../etc/passwd",
+        "../../../windows/system32/config/sam",
+        "..\\..\\..\\windows\\system32\\config\\sam",
+        "%2e%2e%2f%2e%2e%2f%2e%2e%2fetc%2fpasswd",
+    ])
+    def test_path_traversal_attempt(self, flask_app, attempt):
         """Test that path traversal attempts are blocked"""
-        traversal_attempts = [
-            "../../etc/passwd",
-            "../../../windows/system32/config/sam",
-            "..\\..\\..\\windows\\system32\\config\\sam",
-            "%2e%2e%2f%2e%2e%2f%2e%2e%2fetc%2fpasswd",
-        ]
+        body = _body(1, attempt, "test", url=f"https://test.com/{attempt}",
+                     t="2024-01-01T12:00:00Z", summary=f"Test {attempt}")
         
-        for attempt in traversal_attempts:
-            payload = {
-                "heartbeat": {
-                    "status": 1,
-                    "time": "2024-01-01T12:00:00Z",
-                    "ping": 20.0,
-                    "msg": "test"
-                },
-                "monitor": {
-                    "name": attempt,
-                    "type": "http",
-                    "url": f"https://test.com/{attempt}"
-                },
-                "msg": f"Test {attempt}"
-            }
-            
-            response = flask_app.post('/webhook',
-                                     data=json.dumps(payload),
-                                     content_type='application/json')
-            
-            # Should handle safely
-            assert response.status_code in [200, 400]
+        response = flask_app.post('/webhook',
+                                 data=body,
+                                 content_type='application/json')
+        
+        # Should handle safely
+        assert response.status_code in [200, 400]
     
     def test_oversized_payload_rejection(self, flask_app):
         """Test that oversized payloads are rejected"""
-        # Create a very large payload
-        large_string = "x" * (1024 * 1024)  # 1MB string
-        
-        oversized_payload = {
-            "heartbeat": {
-                "status": 1,
-                "time": "2024-01-01T12:00:00Z",
-                "ping": 20.0,
-                "msg": large_string
-            },
-            "monitor": {
-                "name": "Large Monitor",
-                "type": "http",
-                "url": "https://test.com"
-            },
-            "msg": "Large payload test"
-        }
+        # Assemble the ~1MB body directly as bytes; the server only needs to
+        # see its size, so skip building and JSON-escaping a 1MB str
+        oversized_body = b"".join([
+            b'{"heartbeat": {"status": 1, "time": "2024-01-01T12:00:00Z", '
+            b'"ping": 20.0, "msg": "',
+            b"x" * (1024 * 1024),  # 1MB string
+            b'"}, "monitor": {"name": "Large Monitor", "type": "http", '
+            b'"url": "https://test.com"}, "msg": "Large payload test"}'
+        ])
         
         response = flask_app.post('/webhook',
-                                 data=json.dumps(oversized_payload),
+                                 data=oversized_body,
                                  content_type='application/json')
         
         # Should reject oversized payloads
         assert response.status_code in [400, 413, 431]  # Bad request, payload too large, or headers too large
 
 
+@pytest.mark.xdist_group("parse")
 class TestWebhookResponseCodes:
     """Test appropriate HTTP response codes"""
     
     def test_successful_webhook_returns_200(self, flask_app):
         """Test that successful webhook processing returns 200"""
-        payload = {
-            "heartbeat": {
-                "status": 1,
-                "time": "2024-01-01T12:00:00Z",
-                "ping": 25.0,
-                "msg": "OK"
-            },
-            "monitor": {
-                "name": "Success Test",
-                "type": "http",
-                "url": "https://test.com"
-            },
-            "msg": "[Success Test] is up"
-        }
+        body = _body(1, "Success Test", "OK", ping=25.0, t="2024-01-01T12:00:00Z",
+                     summary="[Success Test] is up")
         
         response = flask_app.post('/webhook',
-                                 data=json.dumps(payload),
+                                 data=body,
                                  content_type='application/json')
         
         assert response.status_code == 200
-        assert json.loads(response.data)['status'] == 'success'
+        assert _loads(response.data)['status'] == 'success'
     
     def test_invalid_endpoint_returns_404(self, flask_app):
         """Test that invalid endpoints return 404"""
@@ -605,23 +676,10 @@ class TestWebhookResponseCodes:
     
     def test_cors_headers_present(self, flask_app):
         """Test that CORS headers are properly set if needed"""
-        payload = {
-            "heartbeat": {
-                "status": 1,
-                "time": "2024-01-01T12:00:00Z",
-                "ping": 20.0,
-                "msg": "CORS test"
-            },
-            "monitor": {
-                "name": "CORS Monitor",
-                "type": "http",
-                "url": "https://test.com"
-            },
-            "msg": "CORS test"
-        }
+        body = _body(1, "CORS Monitor", "CORS test", t="2024-01-01T12:00:00Z", summary="CORS test")
         
         response = flask_app.post('/webhook',
-                                 data=json.dumps(payload),
+                                 data=body,
                                  content_type='application/json',
                                  headers={'Origin': 'https://uptime-kuma.example.com'})
         
@@ -1,24 +1,121 @@
 """
 Mock Uptime Kuma simulator for testing
 """
+import asyncio
+import functools
 import json
+import queue
 import time
 import threading
+import zlib
+from collections import defaultdict, deque
+from concurrent.futures import Future
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Callable
+from typing import Dict, List, Optional, Callable, Tuple
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+    
+    def _dumps(payload) -> bytes:
+        return orjson.dumps(payload)
+except ImportError:
+    def _dumps(payload) -> bytes:
+        return json.dumps(payload, default=datetime.isoformat).encode()
+
+
+@functools.lru_cache(maxsize=512)
+def _url_for(monitor_name: str) -> str:
+    """Fake monitored URL derived from the monitor name"""
+    return f"http://{monitor_name.lower().replace(' ', '-')}.example.com"
+
+
+def _monitor_id(monitor_name: str) -> int:
+    """Fake Uptime Kuma monitor ID, the same on every run"""
+    return zlib.crc32(monitor_name.encode()) % 1000
+
+
+@functools.lru_cache(maxsize=512)
+def _monitor_type(monitor_name: str) -> str:
+    """Guess the monitor type: LAN addresses are pinged, the rest is HTTP"""
+    return "ping" if "192.168" in monitor_name else "http"
+
+
+# Tells the webhook worker to exit
+_STOP = object()
+
+# Uptime Kuma heartbeat status codes
+_STATUS_CODE = {"up": 1, "down": 0}
 
 
 class MockUptimeKuma:
     """Simulates Uptime Kuma webhook behavior"""
     
-    def __init__(self, webhook_url: str = "http://localhost:5000/webhook"):
+    def __init__(self, webhook_url: str = "http://localhost:5000/webhook",
+                 history_maxlen: Optional[int] = 10000,
+                 sleep: Callable[[float], None] = time.sleep,
+                 connect_timeout: float = 1.0, read_timeout: float = 3.0):
         self.webhook_url = webhook_url
         self.monitors = {}
-        self.event_history = []
-        self.running = False
+        
+        # Separate bounds so a slow endpoint cannot stall a whole scenario
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        
+        # Names of monitors whose status is 'up'; the monitoring loop only
+        # scans these
+        self._up_monitors = set()
+        
+        # Pauses inside simulate_* scenarios; swap out to fast-forward tests
+        self._sleep = sleep
+        
+        # Bounded history, plus the same entries indexed by monitor name
+        self.history_maxlen = history_maxlen
+        self.event_history = deque(maxlen=history_maxlen)
+        self._history_by_monitor = defaultdict(lambda: deque(maxlen=history_maxlen))
+        self._history_lock = threading.Lock()
         self._thread = None
+        self._task = None
         
+        # Set while stopped; the monitoring loop wakes on _wakeup to exit early
+        self._stop_event = threading.Event()
+        self._stop_event.set()
+        self._loop = None
+        self._wakeup = None
+        
+        # One keep-alive session for every webhook; retries live on the adapter
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4,
+                              max_retries=Retry(total=3, backoff_factor=0.1,
+                                                status_forcelist=[502, 503, 504],
+                                                allowed_methods=['POST']))
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        
+        # Producers queue (payload, future) pairs; a single worker POSTs them
+        # in order, one request per payload. The lock keeps close() from
+        # slipping its stop marker between a check and a put.
+        self._queue = queue.SimpleQueue()
+        self._queue_lock = threading.Lock()
+        self._closed = False
+        self._worker = threading.Thread(target=self._drain_queue,
+                                        name='mock-kuma-webhook', daemon=True)
+        self._worker.start()
+    
+    @classmethod
+    def for_testing(cls, webhook_url: str = "http://localhost:5000/webhook",
+                    **kwargs) -> 'MockUptimeKuma':
+        """Simulator whose scenarios run without real-time pauses"""
+        return cls(webhook_url, sleep=lambda seconds: None, **kwargs)
+    
+    @property
+    def running(self) -> bool:
+        """Whether the monitoring loop is active"""
+        return not self._stop_event.is_set()
+    
     def add_monitor(self, name: str, monitor_type: str = "ping", 
                    interval: int = 30, initial_status: str = "up"):
         """Add a monitor to the simulator"""
@@ -28,42 +125,48 @@ class MockUptimeKuma:
             'interval': interval,
             'status': initial_status,
             'last_check': datetime.now(),
-            'response_time': 20.0
+            'response_time': 20.0,
+            '_template': self._payload_template(name, monitor_type)
         }
+        self._track_status(name, initial_status)
         return self
     
     def trigger_outage(self, monitor_name: str, response_time: float = 0):
         """Simulate a monitor going down"""
-        if monitor_name not in self.monitors:
+        monitor = self.monitors.get(monitor_name)
+        if monitor is None:
             raise ValueError(f"Monitor {monitor_name} not found")
         
-        self.monitors[monitor_name]['status'] = 'down'
-        self.monitors[monitor_name]['response_time'] = response_time
+        monitor['status'] = 'down'
+        monitor['response_time'] = response_time
+        self._up_monitors.discard(monitor_name)
         self._send_webhook(monitor_name, 'down', response_time)
     
     def trigger_recovery(self, monitor_name: str, response_time: float = 25.0):
         """Simulate a monitor recovering"""
-        if monitor_name not in self.monitors:
+        monitor = self.monitors.get(monitor_name)
+        if monitor is None:
             raise ValueError(f"Monitor {monitor_name} not found")
         
-        self.monitors[monitor_name]['status'] = 'up'
-        self.monitors[monitor_name]['response_time'] = response_time
+        monitor['status'] = 'up'
+        monitor['response_time'] = response_time
+        self._up_monitors.add(monitor_name)
         self._send_webhook(monitor_name, 'up', response_time)
     
     def simulate_router_restart(self, recovery_time: int = 25):
         """Simulate a router restart scenario"""
         # Router and services go down
         self.trigger_outage("Router 192.168.1.1")
-        time.sleep(0.5)
+        self._sleep(0.5)
         self.trigger_outage("Google DNS")
         self.trigger_outage("Cloudflare DNS")
         
         # Wait for recovery time
-        time.sleep(recovery_time)
+        self._sleep(recovery_time)
         
         # Router recovers first
         self.trigger_recovery("Router 192.168.1.1", 15.0)
-        time.sleep(0.5)
+        self._sleep(0.5)
         # Then services
         self.trigger_recovery("Google DNS", 30.0)
         self.trigger_recovery("Cloudflare DNS", 28.0)
@@ -72,36 +175,60 @@ class MockUptimeKuma:
         """Simulate an ISP outage"""
         # Router stays up but external services fail
         self._send_webhook("Router 192.168.1.1", "up", 10.0)
-        time.sleep(0.5)
+        self._sleep(0.5)
+        
+        external = ["Google DNS", "Cloudflare DNS", "Google", "Cloudflare"]
         
         # External services down
-        for monitor in ["Google DNS", "Cloudflare DNS", "Google", "Cloudflare"]:
-            self.trigger_outage(monitor)
-            time.sleep(0.2)
+        self._set_status(external, 'down', 0)
+        self._send_webhooks([(monitor, 'down', 0) for monitor in external])
         
         # Wait for duration
-        time.sleep(duration)
+        self._sleep(duration)
         
         # Services recover
-        for monitor in ["Google DNS", "Cloudflare DNS", "Google", "Cloudflare"]:
-            self.trigger_recovery(monitor)
-            time.sleep(0.2)
+        self._set_status(external, 'up', 25.0)
+        self._send_webhooks([(monitor, 'up', 25.0) for monitor in external])
     
     def simulate_power_outage(self):
         """Simulate a power outage"""
         # Everything goes down at once
-        for monitor_name in self.monitors:
-            self.monitors[monitor_name]['status'] = 'down'
-            self._send_webhook(monitor_name, 'down', 0)
+        down_events = [(name, 'down', 0.0) for name in self.monitors]
+        for monitor in self.monitors.values():
+            monitor['status'] = 'down'
+            monitor['response_time'] = 0.0
+        self._up_monitors.clear()
+        self._send_webhooks(down_events)
     
     def simulate_flapping(self, monitor_name: str, count: int = 3, 
                          interval: int = 30):
         """Simulate a flapping service"""
         for i in range(count):
             self.trigger_outage(monitor_name)
-            time.sleep(interval)
+            self._sleep(interval)
+            self.trigger_recovery(monitor_name)
+            self._sleep(interval)
+    
+    async def simulate_flapping_many(self, monitor_names: List[str], count: int = 3,
+                                     interval: int = 30):
+        """Simulate several services flapping at the same time"""
+        await asyncio.gather(*(self._flap_one(monitor_name, count, interval)
+                               for monitor_name in monitor_names))
+    
+    async def _flap_one(self, monitor_name: str, count: int, interval: int):
+        """Flap one service without blocking the event loop"""
+        for i in range(count):
+            self.trigger_outage(monitor_name)
+            await self._pause(interval)
             self.trigger_recovery(monitor_name)
-            time.sleep(interval)
+            await self._pause(interval)
+    
+    async def _pause(self, seconds: float):
+        """Async counterpart of the injected sleep"""
+        if self._sleep is time.sleep:
+            await asyncio.sleep(seconds)
+        else:
+            self._sleep(seconds)
     
     def simulate_pattern(self, pattern_name: str):
         """Run a predefined failure pattern"""
@@ -119,133 +246,342 @@ class MockUptimeKuma:
         patterns[pattern_name]()
     
     def _send_webhook(self, monitor_name: str, status: str, 
-                     response_time: float = 0):
-        """Send webhook to the configured URL"""
-        payload = self._create_payload(monitor_name, status, response_time)
+                     response_time: float = 0,
+                     now: Optional[datetime] = None) -> Future:
+        """Queue a webhook to the configured URL
+        
+        Returns a Future resolving to True if the webhook got a 200.
+        """
+        now = now or datetime.now()
+        monitor = self.monitors.get(monitor_name) or self._ensure_monitor(monitor_name, status)
+        
+        # Same shape as _create_payload, built inline on this hot path
+        template = monitor['_template']
+        heartbeat_msg, msg = template['messages'][status]
+        payload = {
+            "heartbeat": {
+                "status": _STATUS_CODE[status],
+                "time": now,
+                "ping": response_time,
+                "msg": heartbeat_msg,
+                "monitorID": template['monitor_id'],
+                "important": status == "down"
+            },
+            "monitor": dict(template['monitor']),
+            "msg": msg
+        }
         
         # Store in history
-        self.event_history.append({
-            'timestamp': datetime.now(),
+        self._record_event({
+            'timestamp': now,
             'monitor': monitor_name,
             'status': status,
             'payload': payload
         })
         
-        # Send webhook
+        return self._enqueue(payload)
+    
+    def _send_webhooks(self, events: List[Tuple[str, str, float]],
+                       now: Optional[datetime] = None) -> List[Future]:
+        """Queue simultaneous heartbeats sharing one timestamp
+        
+        Like Uptime Kuma, each heartbeat is still its own webhook; returns
+        one Future per heartbeat.
+        """
+        return [self._enqueue(payload) for payload in self._build_payloads(events, now)]
+    
+    def _enqueue(self, payload) -> Future:
+        """Hand a payload to the webhook worker
+        
+        Once the simulator is closed the worker is gone, so the returned
+        Future has already failed with RuntimeError instead of never resolving.
+        """
+        future = Future()
+        with self._queue_lock:
+            if self._closed:
+                future.set_exception(RuntimeError("MockUptimeKuma is closed"))
+            else:
+                self._queue.put((payload, future))
+        return future
+    
+    def _drain_queue(self):
+        """Webhook worker: POST each queued payload as its own request
+        
+        Payloads are never merged, so the endpoint sees the same one-object
+        bodies Uptime Kuma sends.
+        """
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            
+            payload, future = item
+            try:
+                result = self._post_webhook(payload)
+            except Exception as e:
+                # Fail the waiting future rather than killing the worker
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+    
+    def _build_payloads(self, events: List[Tuple[str, str, float]],
+                        now: Optional[datetime] = None) -> List[Dict]:
+        """Build one webhook payload per event and record them in history
+        
+        All the events share one timestamp.
+        """
+        now = now or datetime.now()
+        for name, status, _ in events:
+            self._ensure_monitor(name, status)
+        payload = [self._create_payload(name, status, response_time, now)
+                   for name, status, response_time in events]
+        
+        for (name, status, _), event_payload in zip(events, payload):
+            self._record_event({
+                'timestamp': now,
+                'monitor': name,
+                'status': status,
+                'payload': event_payload
+            })
+        return payload
+    
+    def _record_event(self, entry: Dict):
+        """Append a sent event to the history and its per-monitor index"""
+        with self._history_lock:
+            self.event_history.append(entry)
+            self._history_by_monitor[entry['monitor']].append(entry)
+    
+    def _ensure_monitor(self, monitor_name: str, status: str) -> Dict:
+        """Return a monitor's record, registering it as HTTP on first use
+        
+        A new monitor starts in ``status``, the status about to be sent for it.
+        """
+        if monitor_name not in self.monitors:
+            self.add_monitor(monitor_name, monitor_type='http', initial_status=status)
+        return self.monitors[monitor_name]
+    
+    def _set_status(self, monitor_names: List[str], status: str,
+                    response_time: float):
+        """Update the simulated state of several monitors at once"""
+        for monitor_name in monitor_names:
+            monitor = self.monitors.get(monitor_name)
+            if monitor is None:
+                raise ValueError(f"Monitor {monitor_name} not found")
+            monitor['status'] = status
+            monitor['response_time'] = response_time
+            self._track_status(monitor_name, status)
+    
+    def _track_status(self, monitor_name: str, status: str):
+        """Keep the set of up monitors in step with a status change"""
+        if status == 'up':
+            self._up_monitors.add(monitor_name)
+        else:
+            self._up_monitors.discard(monitor_name)
+    
+    def _post_webhook(self, payload) -> bool:
+        """POST a webhook payload, run on the webhook worker"""
         try:
-            response = requests.post(
+            response = self._session.post(
                 self.webhook_url,
-                json=payload,
+                data=_dumps(payload),
                 headers={'Content-Type': 'application/json'},
-                timeout=5
+                timeout=(self.connect_timeout, self.read_timeout)
             )
             return response.status_code == 200
         except requests.exceptions.RequestException as e:
             print(f"Failed to send webhook: {e}")
             return False
     
+    @staticmethod
+    def _payload_template(monitor_name: str, monitor_type: str) -> Dict:
+        """Parts of a monitor's webhook payload that never change"""
+        return {
+            'monitor': {
+                "name": monitor_name,
+                "type": monitor_type,
+                "url": _url_for(monitor_name)
+            },
+            'monitor_id': _monitor_id(monitor_name),
+            'messages': {
+                status: (f"{monitor_name} is {status}", f"[{monitor_name}] is {status}")
+                for status in ('up', 'down')
+            }
+        }
+    
     def _create_payload(self, monitor_name: str, status: str, 
-                       response_time: float) -> Dict:
+                       response_time: float,
+                       now: Optional[datetime] = None) -> Dict:
         """Create Uptime Kuma webhook payload"""
-        monitor = self.monitors.get(monitor_name, {
-            'name': monitor_name,
-            'type': 'http'
-        })
-        
-        status_code = 1 if status == "up" else 0
+        template = self.monitors[monitor_name]['_template']
+        heartbeat_msg, msg = template['messages'][status]
         
         return {
             "heartbeat": {
-                "status": status_code,
-                "time": datetime.now().isoformat(),
+                "status": _STATUS_CODE[status],
+                "time": now or datetime.now(),  # serialized to ISO 8601 on send
                 "ping": response_time,
-                "msg": f"{monitor_name} is {status}",
-                "monitorID": hash(monitor_name) % 1000,
+                "msg": heartbeat_msg,
+                "monitorID": template['monitor_id'],
                 "important": status == "down"
             },
-            "monitor": {
-                "name": monitor_name,
-                "type": monitor['type'],
-                "url": f"http://{monitor_name.lower().replace(' ', '-')}.example.com"
-            },
-            "msg": f"[{monitor_name}] is {status}"
+            "monitor": dict(template['monitor']),
+            "msg": msg
         }
     
     def start_monitoring(self, check_interval: int = 30):
-        """Start continuous monitoring simulation"""
+        """Start continuous monitoring simulation
+        
+        Each tick's heartbeats go out as individual webhooks, posted
+        concurrently from one event loop. Called from inside a running event
+        loop, the loop is scheduled there as a task; otherwise it gets a
+        dedicated thread.
+        """
         if self.running:
             return
         
-        self.running = True
-        self._thread = threading.Thread(target=self._monitoring_loop, 
-                                       args=(check_interval,))
-        self._thread.daemon = True
-        self._thread.start()
+        self._stop_event.clear()
+        loop_coro = self._monitoring_loop(check_interval)
+        try:
+            self._task = asyncio.get_running_loop().create_task(loop_coro)
+        except RuntimeError:
+            self._thread = threading.Thread(target=asyncio.run, args=(loop_coro,))
+            self._thread.daemon = True
+            self._thread.start()
     
     def stop_monitoring(self):
-        """Stop continuous monitoring"""
-        self.running = False
+        """Stop continuous monitoring; the simulator can still send webhooks"""
+        self._stop_event.set()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        self._task = None
         if self._thread:
             self._thread.join(timeout=5)
     
-    def _monitoring_loop(self, check_interval: int):
+    def __enter__(self) -> 'MockUptimeKuma':
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def close(self):
+        """Stop monitoring, wait for queued webhooks, then close the HTTP session
+        
+        Webhooks sent after this fail immediately.
+        """
+        self.stop_monitoring()
+        with self._queue_lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(_STOP)
+        self._worker.join()
+        self._session.close()
+    
+    async def _monitoring_loop(self, check_interval: int):
         """Main monitoring loop"""
-        while self.running:
-            for monitor_name, monitor in self.monitors.items():
-                if monitor['status'] == 'up':
-                    # Send heartbeat
-                    self._send_webhook(monitor_name, 'up', 
-                                     monitor['response_time'])
-            
-            time.sleep(check_interval)
+        limits = httpx.Limits(max_connections=16, keepalive_expiry=60)
+        timeout = httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+        self._wakeup = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        try:
+            async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+                while not self._stop_event.is_set():
+                    # Send heartbeats for every monitor that is up; snapshot
+                    # the set so other threads may change it mid-tick
+                    if self._up_monitors:
+                        heartbeats = [(monitor_name, 'up',
+                                       self.monitors[monitor_name]['response_time'])
+                                      for monitor_name in tuple(self._up_monitors)]
+                        await asyncio.gather(*(self._post_webhook_async(client, payload)
+                                               for payload in self._build_payloads(heartbeats)))
+                    
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), check_interval)
+                        break
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            self._loop = None
+    
+    async def _post_webhook_async(self, client: httpx.AsyncClient, payload) -> bool:
+        """POST a webhook payload from the monitoring event loop"""
+        try:
+            response = await client.post(self.webhook_url, content=_dumps(payload),
+                                         headers={'Content-Type': 'application/json'})
+            return response.status_code == 200
+        except httpx.HTTPError as e:
+            print(f"Failed to send webhook: {e}")
+            return False
     
     def get_event_history(self, monitor_name: Optional[str] = None) -> List[Dict]:
         """Get event history, optionally filtered by monitor"""
         if monitor_name:
-            return [e for e in self.event_history if e['monitor'] == monitor_name]
-        return self.event_history
+            return list(self._history_by_monitor.get(monitor_name, ()))
+        return list(self.event_history)
     
     def clear_history(self):
         """Clear event history"""
-        self.event_history = []
+        with self._history_lock:
+            self.event_history.clear()
+            self._history_by_monitor.clear()
     
     def reset(self):
         """Reset all monitors to initial state"""
         for monitor in self.monitors.values():
             monitor['status'] = 'up'
             monitor['response_time'] = 20.0
+        self._up_monitors.update(self.monitors)
         self.clear_history()
 
 
 class MockUptimeKumaAsync:
     """Async version for testing with asyncio"""
     
-    def __init__(self, webhook_callback: Callable):
+    def __init__(self, webhook_callback: Callable,
+                 history_maxlen: Optional[int] = 10000):
         self.webhook_callback = webhook_callback
         self.monitors = {}
-        self.event_history = []
+        self.event_history = deque(maxlen=history_maxlen)
     
     async def send_event(self, monitor_name: str, status: str, 
                         response_time: float = 20.0):
         """Send event through callback instead of HTTP"""
-        payload = {
+        now = datetime.now()
+        payload = self._build_heartbeat(monitor_name, status, response_time, now.isoformat())
+        self._record_events([(monitor_name, status, response_time)], now)
+        
+        await self.webhook_callback(payload)
+    
+    async def send_events(self, events: List[Tuple[str, str, float]]):
+        """Send simultaneous events, one callback per heartbeat"""
+        now = datetime.now()
+        iso_now = now.isoformat()
+        self._record_events(events, now)
+        
+        for name, status, response_time in events:
+            await self.webhook_callback(
+                self._build_heartbeat(name, status, response_time, iso_now))
+    
+    def _build_heartbeat(self, monitor_name: str, status: str,
+                         response_time: float, time_iso: str) -> Dict:
+        """Create a single Uptime Kuma webhook payload"""
+        return {
             "heartbeat": {
-                "status": 1 if status == "up" else 0,
-                "time": datetime.now().isoformat(),
+                "status": _STATUS_CODE[status],
+                "time": time_iso,
                 "ping": response_time,
                 "msg": f"{monitor_name} is {status}"
             },
             "monitor": {
                 "name": monitor_name,
-                "type": "ping" if "192.168" in monitor_name else "http"
+                "type": _monitor_type(monitor_name)
             },
             "msg": f"[{monitor_name}] is {status}"
         }
-        
-        self.event_history.append({
-            'timestamp': datetime.now(),
+    
+    def _record_events(self, events: List[Tuple[str, str, float]], now: datetime):
+        """Append sent events to the history"""
+        self.event_history.extend({
+            'timestamp': now,
             'monitor': monitor_name,
             'status': status
-        })
-        
-        await self.webhook_callback(payload)
\ No newline at end of file
+        } for monitor_name, status, _ in events)
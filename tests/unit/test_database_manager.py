@@ -4,7 +4,6 @@ Tests CRUD operations, concurrent access, timezone handling, and query methods
 """
 import pytest
 import sqlite3
-import tempfile
 import os
 import threading
 import time
@@ -12,18 +11,11 @@ from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from freezegun import freeze_time
 import pytz
 
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-import importlib.util
-spec = importlib.util.spec_from_file_location("uptime_bot", "uptime-telegram-bot.py")
-uptime_bot = importlib.util.module_from_spec(spec)
-sys.modules["uptime_bot"] = uptime_bot
-spec.loader.exec_module(uptime_bot)
-
 from uptime_bot import DatabaseManager, MonitorEvent
 
 
@@ -34,11 +26,8 @@ class TestDatabaseManagerCRUD:
         """Test that database initializes with correct schema"""
         db = DatabaseManager(temp_db)
         
-        # Verify database file exists
-        assert os.path.exists(temp_db)
-        
         # Verify events table exists with correct schema
-        conn = sqlite3.connect(temp_db)
+        conn = db.connect()
         cursor = conn.cursor()
         cursor.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='events'")
         schema = cursor.fetchone()[0]
@@ -50,6 +39,78 @@ class TestDatabaseManagerCRUD:
         assert 'message' in schema
         conn.close()
     
+    def test_per_monitor_query_uses_composite_index(self, db_manager):
+        """Test that per-monitor lookups walk (monitor_name, timestamp) without sorting"""
+        conn = db_manager.reader()
+        plan = " ".join(row[-1] for row in conn.execute('''
+            EXPLAIN QUERY PLAN
+            SELECT timestamp FROM events
+            WHERE monitor_name = ? AND timestamp >= ?
+            ORDER BY timestamp DESC
+        ''', ("Router", 0)))
+        
+        assert 'idx_events_monitor_ts_status' in plan
+        assert 'TEMP B-TREE' not in plan
+    
+    def test_uptime_query_uses_covering_index(self, db_manager):
+        """Test that the uptime count is answered from the index alone"""
+        conn = db_manager.reader()
+        plan = " ".join(row[-1] for row in conn.execute(
+            "EXPLAIN QUERY PLAN " + DatabaseManager.UPTIME, ("Router", 0)))
+        
+        assert 'COVERING INDEX idx_events_monitor_ts_status' in plan
+    
+    def test_recent_events_query_range_scans_primary_key(self, db_manager):
+        """Test that the time-window lookup seeks on (timestamp, id) without sorting"""
+        conn = db_manager.reader()
+        plan = " ".join(row[-1] for row in conn.execute(
+            "EXPLAIN QUERY PLAN " + DatabaseManager.RECENT_EVENTS, (0,)))
+        
+        assert 'SEARCH events USING PRIMARY KEY (timestamp>?)' in plan
+        assert 'TEMP B-TREE' not in plan
+    
+    def test_file_database_uses_wal(self, temp_db_file):
+        """Test that file-backed databases are switched to WAL journaling"""
+        db = DatabaseManager(temp_db_file)
+        
+        conn = db.connect()
+        journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        conn.close()
+        
+        assert journal_mode == 'wal'
+    
+    def test_legacy_text_timestamps_migrated(self, tmp_path):
+        """Test that ISO text timestamps from older databases become epoch microseconds"""
+        db_path = str(tmp_path / "legacy.db")
+        event_time = datetime.now() - timedelta(minutes=1)
+        
+        conn = sqlite3.connect(db_path)
+        conn.execute('''
+            CREATE TABLE events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                monitor_name TEXT NOT NULL,
+                status TEXT NOT NULL,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                message TEXT,
+                response_time REAL,
+                analysis_type TEXT
+            )
+        ''')
+        conn.execute(
+            "INSERT INTO events (monitor_name, status, timestamp) VALUES (?, ?, ?)",
+            ("Legacy Monitor", "down", event_time.isoformat())
+        )
+        conn.commit()
+        conn.close()
+        
+        db = DatabaseManager(db_path)
+        recent = db.get_recent_events(5)
+        
+        assert len(recent) == 1
+        assert recent[0]['monitor_name'] == "Legacy Monitor"
+        assert recent[0]['timestamp'] == event_time
+        db.close()
+    
     def test_add_event_basic(self, db_manager):
         """Test adding a single event to database"""
         event = MonitorEvent(
@@ -93,6 +154,25 @@ class TestDatabaseManagerCRUD:
         assert recent[0]['message'] == "Event 9"
         assert recent[-1]['message'] == "Event 0"
     
+    def test_add_events_bulk(self, db_manager):
+        """Test adding a batch of events in one call"""
+        base_time = datetime.now()
+        events = [
+            MonitorEvent(
+                monitor_name=f"Bulk Monitor {i}",
+                status="up",
+                response_time=20.0,
+                timestamp=base_time + timedelta(seconds=i),
+                message=f"Bulk {i}"
+            )
+            for i in range(5)
+        ]
+        
+        assert db_manager.add_events(events) == 5
+        
+        recent = db_manager.get_recent_events(15)
+        assert [e['message'] for e in recent] == [f"Bulk {i}" for i in reversed(range(5))]
+    
     def test_get_recent_events_with_minutes_filter(self, db_manager):
         """Test retrieving events within specific time window"""
         base_time = datetime.now()
@@ -145,8 +225,11 @@ class TestDatabaseManagerCRUD:
         
         assert len(recent) == 1
         assert recent[0]['monitor_name'] == "Persistent Monitor"
+        db1.close()
+        db2.close()
 
 
+@pytest.mark.writable_db
 class TestDatabaseManagerConcurrency:
     """Test concurrent access and thread safety"""
     
@@ -154,18 +237,20 @@ class TestDatabaseManagerConcurrency:
         """Test multiple threads writing to database simultaneously"""
         num_threads = 10
         events_per_thread = 20
+        start = threading.Barrier(num_threads)
+        base_time = datetime.now()
         
         def write_events(thread_id):
+            start.wait()  # Make sure every writer overlaps
             for i in range(events_per_thread):
                 event = MonitorEvent(
                     monitor_name=f"Thread{thread_id}_Monitor{i}",
                     status="up" if i % 2 == 0 else "down",
                     response_time=20.0 + i,
-                    timestamp=datetime.now(),
+                    timestamp=base_time + timedelta(microseconds=thread_id * events_per_thread + i),
                     message=f"Thread {thread_id} Event {i}"
                 )
                 db_manager.add_event(event)
-                time.sleep(0.001)  # Small delay to increase chance of conflicts
         
         # Run concurrent writes
         with ThreadPoolExecutor(max_workers=num_threads) as executor:
@@ -182,29 +267,31 @@ class TestDatabaseManagerConcurrency:
         write_count = 0
         read_count = 0
         lock = threading.Lock()
+        start = threading.Barrier(6)
+        base_time = datetime.now()
         
         def writer():
             nonlocal write_count
+            start.wait()
             for i in range(50):
                 event = MonitorEvent(
                     monitor_name=f"Writer_Monitor_{i}",
                     status="up",
                     response_time=25.0,
-                    timestamp=datetime.now(),
+                    timestamp=base_time + timedelta(microseconds=i),
                     message=f"Write {i}"
                 )
                 db_manager.add_event(event)
                 with lock:
                     write_count += 1
-                time.sleep(0.002)
         
         def reader():
             nonlocal read_count
+            start.wait()
             for _ in range(100):
                 events = db_manager.get_recent_events(10)
                 with lock:
                     read_count += 1
-                time.sleep(0.001)
         
         # Start readers and writers
         with ThreadPoolExecutor(max_workers=6) as executor:
@@ -236,8 +323,6 @@ class TestDatabaseManagerConcurrency:
             )
             db_manager.add_event(event)
             
-            time.sleep(delay)
-            
             # Check count increased by 1
             final_count = len(db_manager.get_recent_events(minutes=60))
             results.append(final_count - initial_count)
@@ -317,9 +402,9 @@ class TestDatabaseManagerTimezones:
         assert len(events) == 1
         assert events[0]['monitor_name'] == "Naive Monitor"
     
-    @freeze_time("2024-01-01 12:00:00")
     def test_recent_events_timezone_aware(self, db_manager):
         """Test that get_recent_events correctly handles timezone-aware queries"""
+        # Only offsets from the query's own clock matter, so no freezing needed
         now = datetime.now()
         
         # Add events at different times
@@ -455,6 +540,24 @@ class TestDatabaseManagerQueries:
         assert 'uptime_percentage' in report
         assert 'avg_response_time' in report
         assert 'last_status' in report
+    
+    def test_monitor_report_refreshes_after_new_event(self, db_manager):
+        """Test that a cached report is replaced once the monitor gets an event"""
+        base_time = datetime.now()
+        db_manager.add_event(MonitorEvent(
+            monitor_name="Cached Monitor", status="up", response_time=20.0,
+            timestamp=base_time - timedelta(minutes=2), message="first"
+        ))
+        assert db_manager.get_monitor_report("Cached Monitor")['total_events'] == 1
+        
+        db_manager.add_event(MonitorEvent(
+            monitor_name="Cached Monitor", status="down", response_time=0.0,
+            timestamp=base_time - timedelta(minutes=1), message="second"
+        ))
+        report = db_manager.get_monitor_report("Cached Monitor")
+        
+        assert report['total_events'] == 2
+        assert report['last_status'] == "down"
 
 
 class TestDatabaseManagerEdgeCases:
@@ -486,6 +589,47 @@ class TestDatabaseManagerEdgeCases:
         recent = db_manager.get_recent_events(1)
         assert len(recent) == 1
     
+    def test_unstorable_value_does_not_stop_writer(self, db_manager):
+        """A write failing outside SQLite reaches its caller and later writes still run"""
+        event = MonitorEvent(
+            monitor_name="Overflow Monitor",
+            status="up",
+            response_time=2**63,
+            timestamp=datetime.now(),
+            message="Too large for an INTEGER"
+        )
+        
+        with pytest.raises(OverflowError):
+            db_manager.add_event(event)
+        
+        db_manager.add_event(MonitorEvent("Overflow Monitor", "up", datetime.now(), "ok", 20.0))
+        assert db_manager.get_recent_events(10)[0]['message'] == "ok"
+    
+    def test_writes_racing_close_never_hang(self, temp_db):
+        """Test that writes submitted while closing either commit or raise"""
+        db = DatabaseManager(temp_db)
+        start = threading.Barrier(9)
+        
+        def write(i):
+            start.wait()
+            try:
+                return db.add_event(MonitorEvent("Race Monitor", "up", datetime.now(), f"Event {i}"))
+            except RuntimeError:
+                return None
+        
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [executor.submit(write, i) for i in range(8)]
+            start.wait()
+            db.close()
+            results = [f.result(timeout=10) for f in futures]
+        
+        with pytest.raises(RuntimeError):
+            db.add_event(MonitorEvent("Race Monitor", "up", datetime.now()))
+        
+        stored = DatabaseManager(temp_db)
+        assert len(stored.get_recent_events(5)) == sum(r is not None for r in results)
+        stored.close()
+    
     def test_large_dataset_performance(self, db_manager):
         """Test performance with large number of events"""
         import time
@@ -494,15 +638,16 @@ class TestDatabaseManagerEdgeCases:
         base_time = datetime.now()
         start = time.time()
         
-        for i in range(10000):
-            event = MonitorEvent(
+        db_manager.add_events([
+            MonitorEvent(
                 monitor_name=f"Monitor_{i % 10}",
                 status="up" if i % 2 == 0 else "down",
                 response_time=20.0 + (i % 100),
                 timestamp=base_time - timedelta(seconds=i),
                 message=f"Event {i}"
             )
-            db_manager.add_event(event)
+            for i in range(10000)
+        ])
         
         write_time = time.time() - start
         
@@ -551,6 +696,7 @@ class TestDatabaseManagerEdgeCases:
             # Verify old events removed, recent kept
             all_events = db_manager.get_recent_events(minutes=60*24*365)
             assert all('Recent' in e['monitor_name'] for e in all_events)
+            assert len(all_events) == 5
     
     def test_special_characters_in_names(self, db_manager):
         """Test handling of special characters in monitor names"""
@@ -563,24 +709,58 @@ class TestDatabaseManagerEdgeCases:
             "Монитор Unicode"
         ]
         
-        for name in special_names:
-            event = MonitorEvent(
+        base_time = datetime.now()
+        db_manager.add_events([
+            MonitorEvent(
                 monitor_name=name,
                 status="up",
                 response_time=20.0,
-                timestamp=datetime.now(),
+                timestamp=base_time + timedelta(microseconds=i),
                 message=f"Testing {name}"
             )
-            db_manager.add_event(event)
+            for i, name in enumerate(special_names)
+        ])
         
         # Verify all events stored correctly
-        recent = db_manager.get_recent_events(10)
-        stored_names = [e['monitor_name'] for e in recent]
-        
-        for name in special_names:
-            assert name in stored_names
+        stored_names = {e['monitor_name'] for e in db_manager.get_recent_events(10)}
+        assert stored_names >= set(special_names)
+
+
+@pytest.fixture(scope="class")
+def populated_db(tmp_path_factory):
+    """File-backed database filled once for every benchmark in a class"""
+    db = DatabaseManager(str(tmp_path_factory.mktemp("benchmark") / "benchmark.db"))
+    base_time = datetime.now()
+    
+    # 1000 events across five monitors, ten seconds apart
+    db.add_events([
+        MonitorEvent(
+            monitor_name=f"Monitor_{i % 5}",
+            status="up" if i % 2 == 0 else "down",
+            response_time=20.0 + (i % 50),
+            timestamp=base_time - timedelta(seconds=i*10),
+            message=f"Event {i}"
+        )
+        for i in range(1000)
+    ])
+    
+    # 500 hourly checks of one monitor, one in five down
+    db.add_events([
+        MonitorEvent(
+            monitor_name="Uptime Monitor",
+            status="up" if i % 5 != 0 else "down",
+            response_time=25.0,
+            timestamp=base_time - timedelta(hours=i),
+            message=f"Event {i}"
+        )
+        for i in range(500)
+    ])
+    
+    yield db
+    db.close()
 
 
+@pytest.mark.xdist_group("benchmark")
 class TestDatabaseManagerBenchmarks:
     """Performance benchmarks for database operations"""
     
@@ -601,43 +781,17 @@ class TestDatabaseManagerBenchmarks:
         assert benchmark.stats['mean'] < 0.05
     
     @pytest.mark.benchmark
-    def test_query_performance(self, db_manager, benchmark):
+    def test_query_performance(self, populated_db, benchmark):
         """Benchmark query performance with populated database"""
-        # Pre-populate database
-        base_time = datetime.now()
-        for i in range(1000):
-            event = MonitorEvent(
-                monitor_name=f"Monitor_{i % 5}",
-                status="up" if i % 2 == 0 else "down",
-                response_time=20.0 + (i % 50),
-                timestamp=base_time - timedelta(seconds=i*10),
-                message=f"Event {i}"
-            )
-            db_manager.add_event(event)
-        
-        # Benchmark query
-        result = benchmark(db_manager.get_recent_events, minutes=60)
+        result = benchmark(populated_db.get_recent_events, minutes=60)
         
         # Query should complete in under 100ms
         assert benchmark.stats['mean'] < 0.1
     
     @pytest.mark.benchmark
-    def test_uptime_calculation_performance(self, db_manager, benchmark):
+    def test_uptime_calculation_performance(self, populated_db, benchmark):
         """Benchmark uptime percentage calculation"""
-        # Pre-populate with events
-        base_time = datetime.now()
-        for i in range(500):
-            event = MonitorEvent(
-                monitor_name="Uptime Monitor",
-                status="up" if i % 5 != 0 else "down",
-                response_time=25.0,
-                timestamp=base_time - timedelta(hours=i),
-                message=f"Event {i}"
-            )
-            db_manager.add_event(event)
-        
-        # Benchmark uptime calculation
-        result = benchmark(db_manager.get_uptime_percentage, "Uptime Monitor", 168)  # 7 days
+        result = benchmark(populated_db.get_uptime_percentage, "Uptime Monitor", 168)  # 7 days
         
         # Should complete in under 200ms
         assert benchmark.stats['mean'] < 0.2
\ No newline at end of file
@@ -3,54 +3,88 @@ Unit tests for OutageAnalyzer core logic
 """
 import pytest
 from datetime import datetime, timedelta
-from freezegun import freeze_time
+import time_machine
 import sys
 import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from tests.fixtures.event_factory import EventFactory
+from tests.fixtures.event_factory import EventFactory, load_events
+
+
+ROUTER = 'Router 192.168.1.1'
+
+
+def _snapshot(*monitor_statuses):
+    """Scenario with one event per (monitor, status), all at the start time"""
+    def build(start_time):
+        return [EventFactory.create_event(monitor, status, start_time)
+                for monitor, status in monitor_statuses]
+    return build
+
+
+def _check_isp_outage(result):
+    assert 'ISP' in result['reason']
+    assert ROUTER not in result.get('affected', [])
+
+
+def _check_power_outage(result):
+    assert 'power' in result['reason'].lower()
+    assert len(result.get('affected', [])) >= 3
+
+
+def _check_router_failure(result):
+    assert ROUTER in result.get('affected', [])
+
+
+def _check_router_restart(result):
+    assert result.get('is_temporary') == True
+
+
+def _check_nothing_affected(result):
+    assert result.get('affected', []) == []
+
+
+# (scenario builder, accepted result types, extra checks on the result)
+# Confidence scores were removed from the analyzer, so only the pattern is checked.
+PATTERN_CASES = [
+    pytest.param(EventFactory.isp_outage_sequence, ['ISP_OUTAGE'],
+                 _check_isp_outage, id='isp_outage'),
+    pytest.param(EventFactory.power_outage_sequence, ['POWER_OUTAGE'],
+                 _check_power_outage, id='power_outage'),
+    pytest.param(_snapshot((ROUTER, 'down'), ('Google DNS', 'up'), ('Cloudflare DNS', 'up')),
+                 ['ROUTER_FAILURE'], _check_router_failure, id='router_failure'),
+    pytest.param(lambda start_time: EventFactory.router_restart_sequence(start_time, 25),
+                 ['ROUTER_RESTART'], _check_router_restart, id='router_restart'),
+    pytest.param(_snapshot((ROUTER, 'up'), ('Google DNS', 'up'), ('Cloudflare DNS', 'up')),
+                 ['UNKNOWN', 'ALL_UP', 'ALL_OPERATIONAL'], _check_nothing_affected,
+                 id='all_services_up'),
+]
+
+
+@pytest.fixture
+def frozen_start():
+    """Freeze the clock for one test and return the frozen start time"""
+    with time_machine.travel("2024-01-01 12:00:00", tick=False):
+        yield datetime.now()
 
 
 class TestOutageAnalyzer:
     """Test suite for OutageAnalyzer pattern detection"""
     
-    def test_isp_outage_detection(self, analyzer, db_manager):
-        """Router up + external services down = ISP_OUTAGE with 90% confidence"""
-        with freeze_time("2024-01-01 12:00:00"):
-            events = EventFactory.isp_outage_sequence(datetime.now())
-            
-            for event in events:
-                db_manager.add_event(type('MonitorEvent', (), event)())
-            
-            recent_events = db_manager.get_recent_events(5)
-            result = analyzer.analyze_pattern(recent_events)
-            
-            assert result['type'] == 'ISP_OUTAGE'
-            # Confidence removed - checking pattern detection only
-            # assert result['confidence'] >= 0.90
-            assert 'ISP' in result['reason']
-            assert 'Router 192.168.1.1' not in result.get('affected', [])
-    
-    def test_power_outage_detection(self, analyzer, db_manager):
-        """All monitors down = POWER_OUTAGE with 95% confidence"""
-        with freeze_time("2024-01-01 12:00:00"):
-            events = EventFactory.power_outage_sequence(datetime.now())
-            
-            for event in events:
-                db_manager.add_event(type('MonitorEvent', (), event)())
-            
-            recent_events = db_manager.get_recent_events(5)
-            result = analyzer.analyze_pattern(recent_events)
-            
-            assert result['type'] == 'POWER_OUTAGE'
-            # Confidence removed - checking pattern detection only
-            # assert result['confidence'] >= 0.95
-            assert 'Power' in result['reason'] or 'power' in result['reason']
-            assert len(result.get('affected', [])) >= 3
+    @pytest.mark.parametrize("build_events,expected_types,check", PATTERN_CASES)
+    def test_pattern_detection(self, analyzer, db_manager, frozen_start,
+                               build_events, expected_types, check):
+        """Seeded scenario is classified as the expected outage pattern"""
+        load_events(db_manager, build_events(frozen_start))
+        
+        result = analyzer.analyze_recent(5)
+        
+        assert result['type'] in expected_types
+        check(result)
     
     def test_partial_outage_detection(self, analyzer, db_manager):
         """Some services down = PARTIAL_OUTAGE"""
-        with freeze_time("2024-01-01 12:00:00"):
+        with time_machine.travel("2024-01-01 12:00:00", tick=False):
             start_time = datetime.now()
             
             events = [
@@ -60,11 +94,9 @@ class TestOutageAnalyzer:
                 EventFactory.create_event('Google', 'down', start_time)
             ]
             
-            for event in events:
-                db_manager.add_event(type('MonitorEvent', (), event)())
+            load_events(db_manager, events)
             
-            recent_events = db_manager.get_recent_events(5)
-            result = analyzer.analyze_pattern(recent_events)
+            result = analyzer.analyze_recent(5)
             
             assert result['type'] == 'PARTIAL_OUTAGE'
             # Confidence removed - checking pattern detection only
@@ -72,85 +104,18 @@ class TestOutageAnalyzer:
             assert 'Google DNS' in result.get('affected', [])
             assert 'Google' in result.get('affected', [])
     
-    def test_router_failure_detection(self, analyzer, db_manager):
-        """Only router down = ROUTER_FAILURE"""
-        with freeze_time("2024-01-01 12:00:00"):
-            start_time = datetime.now()
-            
-            events = [
-                EventFactory.create_event('Router 192.168.1.1', 'down', start_time),
-                EventFactory.create_event('Google DNS', 'up', start_time),
-                EventFactory.create_event('Cloudflare DNS', 'up', start_time)
-            ]
-            
-            for event in events:
-                db_manager.add_event(type('MonitorEvent', (), event)())
-            
-            recent_events = db_manager.get_recent_events(5)
-            result = analyzer.analyze_pattern(recent_events)
-            
-            assert result['type'] == 'ROUTER_FAILURE'
-            # Confidence removed - checking pattern detection only
-            # assert result['confidence'] >= 0.85
-            assert 'Router 192.168.1.1' in result.get('affected', [])
-    
     def test_no_recent_events_returns_unknown(self, analyzer, db_manager):
         """No recent events should return UNKNOWN with 0 confidence"""
-        recent_events = db_manager.get_recent_events(5)
-        result = analyzer.analyze_pattern(recent_events)
+        result = analyzer.analyze_recent(5)
         
         assert result['type'] == 'UNKNOWN'
         # Confidence removed - only checking pattern type
         # assert result['confidence'] == 0.0
         assert 'No recent events' in result['reason']
     
-    def test_all_services_up_detection(self, analyzer, db_manager):
-        """All services up should return appropriate status"""
-        with freeze_time("2024-01-01 12:00:00"):
-            start_time = datetime.now()
-            
-            events = [
-                EventFactory.create_event('Router 192.168.1.1', 'up', start_time),
-                EventFactory.create_event('Google DNS', 'up', start_time),
-                EventFactory.create_event('Cloudflare DNS', 'up', start_time)
-            ]
-            
-            for event in events:
-                db_manager.add_event(type('MonitorEvent', (), event)())
-            
-            recent_events = db_manager.get_recent_events(5)
-            result = analyzer.analyze_pattern(recent_events)
-            
-            assert result['type'] in ['UNKNOWN', 'ALL_UP']
-            assert result.get('affected', []) == []
-    
-    def test_confidence_score_calculations(self, analyzer, db_manager):
-        """Test that confidence scores are calculated correctly"""
-        test_cases = [
-            # (events, expected_type, min_confidence)
-            (EventFactory.power_outage_sequence(datetime.now()), 'POWER_OUTAGE', 0.95),
-            (EventFactory.isp_outage_sequence(datetime.now()), 'ISP_OUTAGE', 0.90),
-            (EventFactory.router_restart_sequence(datetime.now(), 25), 'ROUTER_RESTART', 0.85),
-        ]
-        
-        for events, expected_type, min_confidence in test_cases:
-            # Clear database
-            db_manager.init_db()
-            
-            with freeze_time("2024-01-01 12:00:00"):
-                for event in events:
-                    db_manager.add_event(type('MonitorEvent', (), event)())
-                
-                recent_events = db_manager.get_recent_events(5)
-                result = analyzer.analyze_pattern(recent_events)
-                
-                assert result['type'] == expected_type
-                # Confidence removed - checking pattern detection only
-            # assert result['confidence'] >= min_confidence
-    
     def test_affected_services_list_generation(self, analyzer, db_manager):
         """Test that affected services are correctly identified"""
-        with freeze_time("2024-01-01 12:00:00"):
+        with time_machine.travel("2024-01-01 12:00:00", tick=False):
             start_time = datetime.now()
             
             events = [
@@ -160,11 +125,9 @@ class TestOutageAnalyzer:
                 EventFactory.create_event('Wikipedia', 'down', start_time)
             ]
             
-            for event in events:
-                db_manager.add_event(type('MonitorEvent', (), event)())
+            load_events(db_manager, events)
             
-            recent_events = db_manager.get_recent_events(5)
-            result = analyzer.analyze_pattern(recent_events)
+            result = analyzer.analyze_recent(5)
             
             affected = result.get('affected', [])
             assert 'Router 192.168.1.1' in affected
@@ -172,18 +135,18 @@ class TestOutageAnalyzer:
             assert 'Wikipedia' in affected
             assert 'Cloudflare DNS' not in affected
     
-    def test_analysis_window_configuration(self, analyzer, db_manager, monkeypatch):
-        """Test that ANALYSIS_WINDOW env var is respected"""
+    def test_analysis_window_configuration(self, analyzer, db_manager):
+        """Test that the analyzer's analysis window is respected"""
         # Set custom analysis window to 10 minutes
-        monkeypatch.setenv('ANALYSIS_WINDOW', '10')
+        analyzer.analysis_window = 10
         
-        with freeze_time("2024-01-01 12:00:00") as frozen_time:
+        with time_machine.travel("2024-01-01 12:00:00", tick=False) as frozen_time:
             # Add old event (11 minutes ago)
             old_event = EventFactory.create_event(
                 'Router 192.168.1.1', 'down',
                 datetime.now() - timedelta(minutes=11)
             )
-            db_manager.add_event(type('MonitorEvent', (), old_event)())
+            db_manager.add_event(old_event)
             
             # Add recent event (5 minutes ago)
             frozen_time.move_to("2024-01-01 12:05:00")
@@ -191,10 +154,10 @@ class TestOutageAnalyzer:
                 'Google DNS', 'down',
                 datetime.now()
             )
-            db_manager.add_event(type('MonitorEvent', (), recent_event)())
+            db_manager.add_event(recent_event)
             
             # Get events with 10-minute window
-            recent_events = db_manager.get_recent_events(10)
+            recent_events = db_manager.get_recent_events(analyzer.analysis_window)
             
             # Old event should not be included
             monitor_names = [e['monitor_name'] for e in recent_events]
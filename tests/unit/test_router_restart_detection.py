@@ -4,12 +4,12 @@ Tests the ability to distinguish between quick router restarts and actual outage
 """
 import pytest
 from datetime import datetime, timedelta
-from freezegun import freeze_time
+import time_machine
 import sys
 import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from tests.fixtures.event_factory import EventFactory
+from tests.fixtures.event_factory import EventFactory, load_events
 
 
 class TestRouterRestartDetection:
@@ -17,31 +17,23 @@ class TestRouterRestartDetection:
     
     def test_quick_router_restart_no_alert(self, analyzer, db_manager):
         """Quick restart (<30s) should be detected as ROUTER_RESTART, not outage"""
-        with freeze_time("2024-01-01 12:00:00") as frozen_time:
+        with time_machine.travel("2024-01-01 12:00:00", tick=False) as frozen_time:
             # Router goes down
             start_time = datetime.now()
             events = EventFactory.router_restart_sequence(start_time, recovery_seconds=25)
             
             # Add events to database
-            for event in events[:3]:  # Add down events
-                db_manager.add_event(
-                    type('MonitorEvent', (), event)()
-                )
+            load_events(db_manager, events[:3])  # Add down events
             
             # Analyze pattern - should not trigger alert yet
-            recent_events = db_manager.get_recent_events(5)
-            result = analyzer.analyze_pattern(recent_events)
+            result = analyzer.analyze_recent(5)
             
             # Move time forward and add recovery events
             frozen_time.move_to("2024-01-01 12:00:25")
-            for event in events[3:]:  # Add up events
-                db_manager.add_event(
-                    type('MonitorEvent', (), event)()
-                )
+            load_events(db_manager, events[3:])  # Add up events
             
             # Analyze again after recovery
-            recent_events = db_manager.get_recent_events(5)
-            result = analyzer.analyze_pattern(recent_events)
+            result = analyzer.analyze_recent(5)
             
             assert result['type'] == 'ROUTER_RESTART'
             assert result.get('is_temporary') == True
@@ -50,7 +42,7 @@ class TestRouterRestartDetection:
     
     def test_extended_router_outage_triggers_alert(self, analyzer, db_manager):
         """Extended outage (>2 min) should trigger ROUTER_FAILURE alert"""
-        with freeze_time("2024-01-01 12:00:00") as frozen_time:
+        with time_machine.travel("2024-01-01 12:00:00", tick=False) as frozen_time:
             start_time = datetime.now()
             
             # Router and services go down
@@ -60,17 +52,13 @@ class TestRouterRestartDetection:
                 EventFactory.create_event('Cloudflare DNS', 'down', start_time + timedelta(seconds=3))
             ]
             
-            for event in down_events:
-                db_manager.add_event(
-                    type('MonitorEvent', (), event)()
-                )
+            load_events(db_manager, down_events)
             
             # Move time forward beyond grace period (2+ minutes)
             frozen_time.move_to("2024-01-01 12:02:30")
             
             # Analyze pattern - should detect as outage now
-            recent_events = db_manager.get_recent_events(5)
-            result = analyzer.analyze_pattern(recent_events)
+            result = analyzer.analyze_recent(5)
             
             assert result['type'] in ['ROUTER_FAILURE', 'POWER_OUTAGE']
             assert result.get('is_temporary', False) == False
@@ -78,7 +66,7 @@ class TestRouterRestartDetection:
     
     def test_router_flapping_detection(self, analyzer, db_manager):
         """Multiple quick up/down cycles should be detected as flapping"""
-        with freeze_time("2024-01-01 12:00:00") as frozen_time:
+        with time_machine.travel("2024-01-01 12:00:00", tick=False) as frozen_time:
             start_time = datetime.now()
             
             # Generate flapping sequence
@@ -86,21 +74,17 @@ class TestRouterRestartDetection:
                 start_time, 'Router 192.168.1.1', flap_count=3, interval_seconds=20
             )
             
-            for event in flap_events:
-                db_manager.add_event(
-                    type('MonitorEvent', (), event)()
-                )
-                frozen_time.move_to(event['timestamp'])
+            load_events(db_manager, flap_events)
+            frozen_time.move_to(flap_events[-1].timestamp)
             
-            recent_events = db_manager.get_recent_events(5)
-            result = analyzer.analyze_pattern(recent_events)
+            result = analyzer.analyze_recent(5)
             
             # Should detect instability
             assert 'Router 192.168.1.1' in result.get('affected', [])
     
     def test_router_down_services_up_is_router_failure(self, analyzer, db_manager):
         """Only router down while services stay up = ROUTER_FAILURE"""
-        with freeze_time("2024-01-01 12:00:00"):
+        with time_machine.travel("2024-01-01 12:00:00", tick=False):
             start_time = datetime.now()
             
             events = [
@@ -109,32 +93,24 @@ class TestRouterRestartDetection:
                 EventFactory.create_event('Cloudflare DNS', 'up', start_time)
             ]
             
-            for event in events:
-                db_manager.add_event(
-                    type('MonitorEvent', (), event)()
-                )
+            load_events(db_manager, events)
             
-            recent_events = db_manager.get_recent_events(5)
-            result = analyzer.analyze_pattern(recent_events)
+            result = analyzer.analyze_recent(5)
             
             assert result['type'] == 'ROUTER_FAILURE'
             # No longer checking confidence - removed from system
     
     def test_all_down_is_power_outage_not_restart(self, analyzer, db_manager):
         """All services down simultaneously = POWER_OUTAGE, not router restart"""
-        with freeze_time("2024-01-01 12:00:00"):
+        with time_machine.travel("2024-01-01 12:00:00", tick=False):
             start_time = datetime.now()
             
             # Generate power outage sequence
             events = EventFactory.power_outage_sequence(start_time)
             
-            for event in events:
-                db_manager.add_event(
-                    type('MonitorEvent', (), event)()
-                )
+            load_events(db_manager, events)
             
-            recent_events = db_manager.get_recent_events(5)
-            result = analyzer.analyze_pattern(recent_events)
+            result = analyzer.analyze_recent(5)
             
         # Router restart detection might trigger here since all go down together
         # Both POWER_OUTAGE and ROUTER_RESTART are valid interpretations
@@ -145,7 +121,7 @@ class TestRouterRestartDetection:
     
     def test_partial_recovery_within_grace_period(self, analyzer, db_manager):
         """Some services recover within grace period, others don't"""
-        with freeze_time("2024-01-01 12:00:00") as frozen_time:
+        with time_machine.travel("2024-01-01 12:00:00", tick=False) as frozen_time:
             start_time = datetime.now()
             
             # All go down
@@ -155,10 +131,7 @@ class TestRouterRestartDetection:
                 EventFactory.create_event('Cloudflare DNS', 'down', start_time)
             ]
             
-            for event in down_events:
-                db_manager.add_event(
-                    type('MonitorEvent', (), event)()
-                )
+            load_events(db_manager, down_events)
             
             # Router and one service recover quickly
             frozen_time.move_to("2024-01-01 12:00:30")
@@ -167,13 +140,9 @@ class TestRouterRestartDetection:
                 EventFactory.create_event('Google DNS', 'up', datetime.now())
             ]
             
-            for event in recovery_events:
-                db_manager.add_event(
-                    type('MonitorEvent', (), event)()
-                )
+            load_events(db_manager, recovery_events)
             
-            recent_events = db_manager.get_recent_events(5)
-            result = analyzer.analyze_pattern(recent_events)
+            result = analyzer.analyze_recent(5)
             
             # Should still detect router restart pattern
             assert result['type'] == 'ROUTER_RESTART'
@@ -181,78 +150,67 @@ class TestRouterRestartDetection:
     
     def test_interleaved_outages_handled_correctly(self, analyzer, db_manager):
         """Independent outage happening during router restart should be handled separately"""
-        with freeze_time("2024-01-01 12:00:00") as frozen_time:
+        with time_machine.travel("2024-01-01 12:00:00", tick=False) as frozen_time:
             start_time = datetime.now()
             
             # First, an unrelated service fails
             db_manager.add_event(
-                type('MonitorEvent', (), 
-                     EventFactory.create_event('Wikipedia', 'down', start_time))()
+                EventFactory.create_event('Wikipedia', 'down', start_time)
             )
             
             # Then router restart happens
             frozen_time.move_to("2024-01-01 12:01:00")
             router_events = EventFactory.router_restart_sequence(datetime.now(), 20)
             
-            for event in router_events[:3]:  # Down events
-                db_manager.add_event(
-                    type('MonitorEvent', (), event)()
-                )
+            load_events(db_manager, router_events[:3])  # Down events
             
             frozen_time.move_to("2024-01-01 12:01:20")
-            for event in router_events[3:]:  # Recovery events
-                db_manager.add_event(
-                    type('MonitorEvent', (), event)()
-                )
+            load_events(db_manager, router_events[3:])  # Recovery events
             
-            recent_events = db_manager.get_recent_events(5)
-            result = analyzer.analyze_pattern(recent_events)
+            result = analyzer.analyze_recent(5)
             
             # Should detect router restart, not confuse with Wikipedia outage
             assert result['type'] == 'ROUTER_RESTART'
             assert 'Wikipedia' not in result.get('affected', [])
     
-    def test_grace_period_configuration(self, analyzer, db_manager, monkeypatch):
-        """Test that ROUTER_RESTART_GRACE_PERIOD env var is respected"""
+    def test_grace_period_configuration(self, analyzer, db_manager):
+        """Test that the analyzer's router restart grace period is respected"""
         # Set custom grace period to 60 seconds
-        monkeypatch.setenv('ROUTER_RESTART_GRACE_PERIOD', '60')
+        analyzer.router_restart_grace_period = 60
         
-        with freeze_time("2024-01-01 12:00:00") as frozen_time:
+        with time_machine.travel("2024-01-01 12:00:00", tick=False) as frozen_time:
             start_time = datetime.now()
             
             # Router goes down and recovers in 50 seconds (within custom grace)
             down_event = EventFactory.create_event('Router 192.168.1.1', 'down', start_time)
-            db_manager.add_event(type('MonitorEvent', (), down_event)())
+            db_manager.add_event(down_event)
             
             frozen_time.move_to("2024-01-01 12:00:50")
             up_event = EventFactory.create_event('Router 192.168.1.1', 'up', datetime.now())
-            db_manager.add_event(type('MonitorEvent', (), up_event)())
+            db_manager.add_event(up_event)
             
-            recent_events = db_manager.get_recent_events(5)
-            result = analyzer.analyze_pattern(recent_events)
+            result = analyzer.analyze_recent(5)
             
             # Should still be detected as restart (within 60s grace period)
             assert result['type'] == 'ROUTER_RESTART'
     
     def test_monitor_synchronization_prevents_false_positives(self, analyzer, db_manager):
         """All monitors with same interval should prevent false positives"""
-        with freeze_time("2024-01-01 12:00:00") as frozen_time:
+        with time_machine.travel("2024-01-01 12:00:00", tick=False) as frozen_time:
             start_time = datetime.now()
             
             # Simulate monitors reporting at slightly different times (normal behavior)
-            events = []
             monitors = ['Router 192.168.1.1', 'Google DNS', 'Cloudflare DNS']
             
-            for i, monitor in enumerate(monitors):
-                # Each monitor reports with slight offset
-                timestamp = start_time + timedelta(seconds=i * 0.5)
-                events.append(EventFactory.create_event(monitor, 'up', timestamp))
+            # Each monitor reports with slight offset
+            events = EventFactory.create_events_bulk(
+                monitors, ['up'] * len(monitors),
+                [i * 0.5 for i in range(len(monitors))], start_time
+            )
             
-            for event in events:
-                db_manager.add_event(type('MonitorEvent', (), event)())
+            load_events(db_manager, events)
             
-            recent_events = db_manager.get_recent_events(5)
-            result = analyzer.analyze_pattern(recent_events)
+            result = analyzer.analyze_recent(5)
             
             # Should not detect any outage
             assert result['type'] in ['UNKNOWN', 'ALL_UP', 'ALL_OPERATIONAL']
@@ -12,12 +12,7 @@ import sys
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-import importlib.util
-spec = importlib.util.spec_from_file_location("uptime_bot", "uptime-telegram-bot.py")
-uptime_bot = importlib.util.module_from_spec(spec)
-sys.modules["uptime_bot"] = uptime_bot
-spec.loader.exec_module(uptime_bot)
-
+import uptime_bot
 from uptime_bot import TelegramNotifier, DatabaseManager, MonitorEvent
 
 
@@ -384,4 +379,30 @@ class TestTelegramNotifierErrorHandling:
         asyncio.run(notifier.send_alert(event, analysis))
         
         message = mock_bot.send_message.call_args[1]['text']
-        assert "Unknown issue detected" in message or "UNKNOWN" in message
\ No newline at end of file
+        assert "Unknown issue detected" in message or "UNKNOWN" in message
+
+class TestTelegramCommands:
+    """Test the Telegram bot command handlers"""
+    
+    def test_status_command_reports_analysis_and_event_count(self, db_manager, monkeypatch):
+        """Test that /status replies with the current analysis and recent event count"""
+        monkeypatch.setattr(uptime_bot, 'db_manager', db_manager)
+        db_manager.add_events([
+            MonitorEvent(
+                monitor_name=name,
+                status='down',
+                response_time=0.0,
+                timestamp=datetime.now(),
+                message=f'{name} is down'
+            )
+            for name in ('Router 192.168.1.1', 'Google DNS')
+        ])
+        
+        update = MagicMock()
+        update.message.reply_text = AsyncMock()
+        
+        asyncio.run(uptime_bot.cmd_status(update, MagicMock()))
+        
+        message = update.message.reply_text.call_args[0][0]
+        assert "CURRENT STATUS" in message
+        assert "**Recent Events:** 2" in message
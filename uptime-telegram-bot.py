@@ -5,20 +5,27 @@ Receives webhooks from Uptime Kuma and provides intelligent analysis via Telegra
 """
 
 import os
+import sys
 import json
+import functools
+import itertools
+import queue
 import sqlite3
 import asyncio
-from datetime import datetime, timedelta
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
 # Fix for Python 3.12 sqlite3 datetime deprecation
 sqlite3.register_adapter(datetime, lambda val: val.isoformat())
 sqlite3.register_converter("DATETIME", lambda val: datetime.fromisoformat(val.decode()))
+
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 from collections import defaultdict
 
 from flask import Flask, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import threading
 from telegram import Update, Bot
@@ -26,6 +33,11 @@ from telegram.ext import Application, CommandHandler, ContextTypes
 import logging
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:  # fall back to Flask's stdlib json provider
+    orjson = None
+
 # Load environment variables
 load_dotenv()
 
@@ -54,6 +66,22 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+def to_epoch_us(dt: Optional[datetime]) -> int:
+    """Microseconds since the Unix epoch, as stored in ``events.timestamp``
+    
+    Naive datetimes are taken as local time; ``None`` means now.
+    """
+    if dt is None:
+        dt = datetime.now()
+    return (dt.astimezone(timezone.utc) - _EPOCH) // _MICROSECOND
+
+def from_epoch_us(us: int) -> datetime:
+    """Naive local datetime for a stored ``events.timestamp``"""
+    return (_EPOCH + us * _MICROSECOND).astimezone().replace(tzinfo=None)
+
 @dataclass
 class MonitorEvent:
     """Represents a monitor status event"""
@@ -64,27 +92,141 @@ class MonitorEvent:
     response_time: float = 0.0
 
 class DatabaseManager:
-    """Handles all database operations"""
+    """Handles all database operations
+    
+    Writes are queued to a single writer thread that owns one connection and
+    commits whatever has piled up as one transaction. Reads use one
+    long-lived connection per calling thread.
+    """
+    
+    WRITE_BATCH_SIZE = 100
+    WRITER_POLL_SECONDS = 1.0
+    
+    # Bulk loads at least this large refresh the planner's statistics
+    ANALYZE_THRESHOLD = 1000
+    
+    # Hot-path statements; executing the identical string each time lets
+    # every connection reuse its prepared statement from the cache
+    INSERT_EVENT = '''
+        INSERT INTO events (id, monitor_name, status, timestamp, message, response_time, analysis_type)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    '''
+    RECENT_EVENTS = '''
+        SELECT monitor_name, status, timestamp, message, response_time
+        FROM events
+        WHERE timestamp > ?
+        ORDER BY timestamp DESC
+    '''
+    UPTIME = '''
+        SELECT SUM(CASE WHEN status = 'up' THEN 1 ELSE 0 END), COUNT(*)
+        FROM events
+        WHERE monitor_name = ? AND timestamp >= ?
+    '''
+    MONITOR_REPORT = '''
+        SELECT
+            COUNT(*),
+            SUM(CASE WHEN status = 'up' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN status = 'down' THEN 1 ELSE 0 END),
+            AVG(CASE WHEN status = 'up' THEN response_time END),
+            (SELECT status FROM events
+             WHERE monitor_name = ?1 AND timestamp >= ?2
+             ORDER BY timestamp DESC LIMIT 1)
+        FROM events
+        WHERE monitor_name = ?1 AND timestamp >= ?2
+    '''
     
     def __init__(self, db_path: str):
         self.db_path = db_path
+        self._tls = threading.local()
+        self._write_q = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._writer_error = None
+        self._closed = False
         self.init_db()
+        
+        # Event ids are assigned here since the events table has no rowid;
+        # seeding from the clock keeps them increasing across restarts
+        self._event_ids = itertools.count(to_epoch_us(datetime.now()))
+        
+        # Reports are cached per monitor until it gets a new event; the
+        # write count is part of the cache key. Webhook handlers add events
+        # from several threads, so counts are bumped under a lock.
+        self._write_epochs = defaultdict(int)
+        self._epoch_lock = threading.Lock()
+        self._cached_report = functools.lru_cache(maxsize=256)(self._query_monitor_report)
+    
+    @property
+    def in_memory(self) -> bool:
+        """Whether the database lives in memory rather than in a file"""
+        return self.db_path == ':memory:' or 'mode=memory' in self.db_path
+    
+    def connect(self) -> sqlite3.Connection:
+        """Open a connection to the database (file path or ``file:`` URI)
+        
+        Connections use synchronous=NORMAL, so a WAL commit is not fsynced
+        until the next checkpoint. An application crash loses nothing, and a
+        power loss can drop only the last few commits without corrupting the
+        database, which is an acceptable trade for monitoring history.
+        """
+        conn = sqlite3.connect(self.db_path, detect_types=sqlite3.PARSE_DECLTYPES,
+                               uri=self.db_path.startswith('file:'),
+                               cached_statements=256)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-65536")  # up to 64 MiB of pages
+        return conn
     
     def init_db(self):
         """Initialize database tables"""
-        conn = sqlite3.connect(self.db_path, detect_types=sqlite3.PARSE_DECLTYPES)
+        conn = self.connect()
         cursor = conn.cursor()
         
+        # Lets cleanup_old_events hand freed pages back to the filesystem.
+        # It only takes effect on a new database, so it goes first.
+        cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        
+        # WAL lets readers run alongside the writer; the setting is stored
+        # in the database file, so it only needs to be set once
+        if not self.in_memory:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        
+        # Older databases kept events in a rowid table, at first with ISO
+        # text timestamps
+        existing = cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'events'"
+        ).fetchone()
+        legacy = existing is not None and 'WITHOUT ROWID' not in existing[0].upper()
+        if legacy:
+            cursor.execute("ALTER TABLE events RENAME TO events_legacy")
+        
+        # Rows are stored in timestamp order in the primary key B-tree, so
+        # time range scans need no separate index. Timestamps are UTC
+        # microseconds since the epoch (see to_epoch_us).
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS events (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp INTEGER NOT NULL,
+                id INTEGER NOT NULL,
                 monitor_name TEXT NOT NULL,
                 status TEXT NOT NULL,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                message TEXT,
                 response_time REAL,
-                analysis_type TEXT
-            )
+                message TEXT,
+                analysis_type TEXT,
+                PRIMARY KEY (timestamp, id)
+            ) WITHOUT ROWID
+        ''')
+        
+        # Dropping the legacy table also drops its indexes, so migrate
+        # before creating ours
+        if legacy:
+            self._migrate_legacy_events(cursor)
+        
+        # Carrying status makes this a covering index for uptime counts and
+        # last-down lookups; it replaces the narrower idx_events_monitor_ts
+        cursor.execute("DROP INDEX IF EXISTS idx_events_monitor_ts")
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_events_monitor_ts_status
+            ON events(monitor_name, timestamp DESC, status)
         ''')
         
         cursor.execute('''
@@ -101,70 +243,312 @@ class DatabaseManager:
         conn.commit()
         conn.close()
     
-    def add_event(self, event: MonitorEvent, analysis_type: str = None) -> int:
-        """Add new event to database"""
-        conn = sqlite3.connect(self.db_path, detect_types=sqlite3.PARSE_DECLTYPES)
-        cursor = conn.cursor()
+    def _migrate_legacy_events(self, cursor: sqlite3.Cursor):
+        """Copy events from the legacy rowid table into the current one"""
+        rows = cursor.execute('''
+            SELECT id, monitor_name, status, timestamp, message, response_time, analysis_type
+            FROM events_legacy
+        ''').fetchall()
+        cursor.executemany('''
+            INSERT INTO events (id, monitor_name, status, timestamp, message, response_time, analysis_type)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [(row[0], row[1], row[2],
+               row[3] if isinstance(row[3], int) else to_epoch_us(row[3]), *row[4:])
+              for row in rows])
+        cursor.execute("DROP TABLE events_legacy")
+    
+    def reader(self) -> sqlite3.Connection:
+        """This thread's read connection, opened on first use
         
-        cursor.execute('''
-            INSERT INTO events (monitor_name, status, timestamp, message, response_time, analysis_type)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (event.monitor_name, event.status, event.timestamp, 
-              event.message, event.response_time, analysis_type))
+        The connection is shared by later calls on the same thread; callers
+        must not close it.
+        """
+        conn = getattr(self._tls, 'conn', None)
+        if conn is None:
+            conn = self._tls.conn = self.connect()
+        return conn
+    
+    def write(self, sql: str, params: tuple = ()) -> int:
+        """Run one write statement on the writer thread, returning its lastrowid"""
+        return self._submit(sql, params, False)
+    
+    def write_many(self, sql: str, rows: List[tuple]) -> int:
+        """Run a statement for every row in one transaction, returning the row count"""
+        return self._submit(sql, rows, True)
+    
+    def write_script(self, script: str) -> None:
+        """Run a maintenance script on the writer between batches
+        
+        Scripts go through ``executescript``, which commits first; batches are
+        already committed by then.
+        """
+        self._submit(script, None, None)
+    
+    def _submit(self, sql: str, params, many: Optional[bool]) -> int:
+        future = Future()
+        # Enqueue under the lock so nothing can land behind close()'s stop marker
+        with self._writer_lock:
+            if self._closed:
+                raise RuntimeError("DatabaseManager is closed")
+            if self._writer_error is not None:
+                raise RuntimeError("Database writer has stopped") from self._writer_error
+            if self._writer is None:
+                self._start_writer()
+            writer = self._writer
+            self._write_q.put((sql, params, many, future))
+        # Poll so a caller cannot wait forever on a writer that has died
+        while True:
+            try:
+                return future.result(timeout=self.WRITER_POLL_SECONDS)
+            except FutureTimeout:
+                if not writer.is_alive() and not future.done():
+                    raise RuntimeError("Database writer has stopped") from self._writer_error
+    
+    def close(self):
+        """Stop the writer thread once queued writes are committed
+        
+        The writer runs ``PRAGMA optimize`` on its way out. Writes submitted
+        after this raise ``RuntimeError``.
+        """
+        with self._writer_lock:
+            self._closed = True
+            writer, self._writer = self._writer, None
+            if writer is not None:
+                self._write_q.put(None)
+        if writer is not None:
+            writer.join()
+    
+    def _start_writer(self):
+        """Start the writer thread; the caller holds ``_writer_lock``"""
+        self._writer = threading.Thread(target=self._writer_loop,
+                                        name='db-writer', daemon=True)
+        self._writer.start()
+    
+    def _writer_loop(self):
+        """Commit queued writes in batches on a single connection"""
+        conn = self.connect()
+        try:
+            # A stop marker or script ends a batch and is handled next round
+            held = None
+            while True:
+                item = held or self._write_q.get()
+                held = None
+                if item is None:
+                    break
+                if item[2] is None:
+                    self._run_script(conn, item)
+                    continue
+                batch = [item]
+                while len(batch) < self.WRITE_BATCH_SIZE:
+                    try:
+                        item = self._write_q.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None or item[2] is None:
+                        held = item
+                        break
+                    batch.append(item)
+                self._write_batch(conn, batch)
+            conn.execute("PRAGMA optimize")
+        except Exception as e:
+            self._writer_error = e
+            logger.exception("Database writer stopped")
+        finally:
+            conn.close()
+    
+    def _run_script(self, conn: sqlite3.Connection, item: tuple):
+        script, _, _, future = item
+        try:
+            conn.executescript(script)
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(0)
+    
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[tuple]):
+        """Apply a batch atomically; if it fails, retry its writes one by one
         
-        event_id = cursor.lastrowid
+        A savepoint rather than BEGIN/ROLLBACK keeps this correct when the
+        connection is already inside a transaction.
+        """
+        conn.execute("SAVEPOINT write_batch")
+        try:
+            results = [conn.executemany(sql, params).rowcount if many
+                       else conn.execute(sql, params).lastrowid
+                       for sql, params, many, _ in batch]
+        except Exception as e:
+            conn.execute("ROLLBACK TO write_batch")
+            conn.execute("RELEASE write_batch")
+            if len(batch) == 1:
+                batch[0][3].set_exception(e)
+            else:
+                for item in batch:
+                    self._write_batch(conn, [item])
+            return
+        conn.execute("RELEASE write_batch")
         conn.commit()
-        conn.close()
+        
+        for (_, _, _, future), result in zip(batch, results):
+            future.set_result(result)
+    
+    def add_event(self, event: MonitorEvent, analysis_type: str = None) -> int:
+        """Add new event to database"""
+        event_id = next(self._event_ids)
+        self.write(self.INSERT_EVENT,
+                   (event_id, event.monitor_name, event.status, to_epoch_us(event.timestamp),
+                    event.message, event.response_time, analysis_type))
+        self._bump_epochs([event.monitor_name])
         return event_id
     
+    def add_events(self, events: List[MonitorEvent], analysis_type: str = None) -> int:
+        """Add many events in a single transaction, returning how many were stored"""
+        stored = self.write_many(self.INSERT_EVENT,
+                                 [(next(self._event_ids), event.monitor_name, event.status,
+                                   to_epoch_us(event.timestamp),
+                                   event.message, event.response_time, analysis_type)
+                                  for event in events])
+        self._bump_epochs(event.monitor_name for event in events)
+        if stored >= self.ANALYZE_THRESHOLD:
+            self.write("ANALYZE events")
+        return stored
+    
+    def _bump_epochs(self, monitor_names):
+        """Invalidate cached reports for monitors that just got events"""
+        with self._epoch_lock:
+            for monitor_name in monitor_names:
+                self._write_epochs[monitor_name] += 1
+    
     def get_recent_events(self, minutes: int = 5) -> List[Dict]:
         """Get events from last N minutes"""
-        conn = sqlite3.connect(self.db_path, detect_types=sqlite3.PARSE_DECLTYPES)
-        cursor = conn.cursor()
-        
         cutoff_time = datetime.now() - timedelta(minutes=minutes)
-        cursor.execute('''
-            SELECT monitor_name, status, timestamp, message, response_time
-            FROM events
-            WHERE timestamp > ?
-            ORDER BY timestamp DESC
-        ''', (cutoff_time,))
-        
-        events = []
-        for row in cursor.fetchall():
-            events.append({
-                'monitor_name': row[0],
-                'status': row[1],
-                'timestamp': row[2],
-                'message': row[3],
-                'response_time': row[4]
+        rows = self.reader().execute(self.RECENT_EVENTS, (to_epoch_us(cutoff_time),))
+        
+        # Unpack each row tuple straight into its dict, streaming from the
+        # cursor instead of materializing fetchall() first. A handful of
+        # monitors repeat across many rows, so their names are interned.
+        return [
+            {
+                'monitor_name': sys.intern(monitor_name),
+                'status': status,
+                'timestamp': from_epoch_us(timestamp),
+                'message': message,
+                'response_time': response_time
+            }
+            for monitor_name, status, timestamp, message, response_time in rows
+        ]
+    
+    def get_uptime_percentage(self, monitor_name: str, hours: int = 24) -> float:
+        """Share of a monitor's checks in the last N hours that were up"""
+        cutoff = to_epoch_us(datetime.now() - timedelta(hours=hours))
+        up_checks, total = self.reader().execute(
+            self.UPTIME, (monitor_name, cutoff)).fetchone()
+        
+        return 100.0 * up_checks / total if total else 0.0
+    
+    def get_outage_history(self, monitor_name: str, days: int = 7) -> List[Dict]:
+        """A monitor's outages in the last N days, most recent first
+        
+        An outage is a run of consecutive 'down' events; it ends at the next
+        'up' event, or is still ongoing (``end`` is None) if there is none.
+        """
+        cutoff = to_epoch_us(datetime.now() - timedelta(days=days))
+        rows = self.reader().execute('''
+            WITH marked AS (
+                SELECT id, timestamp, status,
+                       status != LAG(status, 1, '') OVER (ORDER BY timestamp, id) AS changed
+                FROM events
+                WHERE monitor_name = ? AND timestamp >= ?
+            ),
+            runs AS (
+                SELECT timestamp, status,
+                       SUM(changed) OVER (ORDER BY timestamp, id) AS run
+                FROM marked
+            ),
+            spans AS (
+                SELECT status, MIN(timestamp) AS start_ts,
+                       LEAD(MIN(timestamp)) OVER (ORDER BY run) AS end_ts
+                FROM runs
+                GROUP BY run
+            )
+            SELECT start_ts, end_ts FROM spans
+            WHERE status = 'down'
+            ORDER BY start_ts DESC
+        ''', (monitor_name, cutoff)).fetchall()
+        
+        outages = []
+        for start_ts, end_ts in rows:
+            start = from_epoch_us(start_ts)
+            end = from_epoch_us(end_ts) if end_ts is not None else None
+            outages.append({
+                'start': start,
+                'end': end,
+                'duration_minutes': int(((end or datetime.now()) - start).total_seconds() // 60)
             })
+        return outages
+    
+    def get_monitor_report(self, monitor_name: str, hours: int = 24) -> Dict:
+        """Event counts, uptime and response time for a monitor over N hours
         
-        conn.close()
-        return events
+        The window starts N hours before the current minute, so a cached
+        report is reused until the monitor gets a new event or the minute
+        rolls over. Writes made through another DatabaseManager are not seen
+        until then.
+        """
+        window_end = datetime.now().replace(second=0, microsecond=0)
+        return dict(self._cached_report(monitor_name, hours, window_end,
+                                        self._write_epochs.get(monitor_name, 0)))
+    
+    def _query_monitor_report(self, monitor_name: str, hours: int,
+                              window_end: datetime, _epoch: int) -> Dict:
+        cutoff = to_epoch_us(window_end - timedelta(hours=hours))
+        total, up_events, down_events, avg_response, last_status = self.reader().execute(
+            self.MONITOR_REPORT, (monitor_name, cutoff)).fetchone()
+        
+        return {
+            'monitor_name': monitor_name,
+            'total_events': total,
+            'up_events': up_events or 0,
+            'down_events': down_events or 0,
+            'uptime_percentage': 100.0 * up_events / total if total else 0.0,
+            'avg_response_time': avg_response or 0.0,
+            'last_status': last_status
+        }
+    
+    def cleanup_old_events(self, days: int = 90) -> int:
+        """Delete events older than N days, returning how many were removed"""
+        cutoff = to_epoch_us(datetime.now() - timedelta(days=days))
+        # write_many reports a row count where write() would give a rowid
+        deleted = self.write_many("DELETE FROM events WHERE timestamp < ?", [(cutoff,)])
+        self._cached_report.cache_clear()
+        
+        # Reclaim the freed pages; only executescript steps this pragma to
+        # completion
+        self.write_script("PRAGMA incremental_vacuum;")
+        return deleted
     
     def record_outage(self, outage_type: str, start_time: datetime, 
                       affected_monitors: List[str]):
         """Record analyzed outage"""
-        conn = sqlite3.connect(self.db_path, detect_types=sqlite3.PARSE_DECLTYPES)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        self.write('''
             INSERT INTO outage_analysis 
             (outage_type, start_time, affected_monitors)
             VALUES (?, ?, ?)
         ''', (outage_type, start_time, json.dumps(affected_monitors)))
-        
-        conn.commit()
-        conn.close()
 
 class OutageAnalyzer:
     """Analyzes patterns to determine outage type"""
     
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
+        self.analysis_window = CONFIG['ANALYSIS_WINDOW']  # minutes
         self.router_restart_grace_period = int(os.getenv('ROUTER_RESTART_GRACE_PERIOD', '120'))  # 2 minutes default
     
+    def analyze_recent(self, minutes: Optional[int] = None) -> Dict:
+        """Analyze the events stored in the last N minutes (default: the analysis window)"""
+        if minutes is None:
+            minutes = self.analysis_window
+        return self.analyze_pattern(self.db.get_recent_events(minutes))
+    
     def analyze_pattern(self, recent_events: List[Dict]) -> Dict:
         """Analyze events to determine outage type"""
         
@@ -322,7 +706,7 @@ Your monitoring setup is working correctly.
     async def send_recovery(self, event: MonitorEvent):
         """Send recovery notification with downtime duration"""
         # Get last down event for this monitor
-        conn = sqlite3.connect(self.db.db_path, detect_types=sqlite3.PARSE_DECLTYPES)
+        conn = self.db.reader()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -332,13 +716,10 @@ Your monitoring setup is working correctly.
         ''', (event.monitor_name,))
         
         down_event = cursor.fetchone()
-        conn.close()
         
         downtime_str = ""
         if down_event:
-            down_time = down_event[0]
-            if isinstance(down_time, str):
-                down_time = datetime.fromisoformat(down_time)
+            down_time = from_epoch_us(down_event[0])
             duration = datetime.now() - down_time
             minutes = int(duration.total_seconds() / 60)
             seconds = int(duration.total_seconds() % 60)
@@ -443,8 +824,29 @@ Service is operational again.
         }
         return recommendations.get(outage_type, 'Monitor situation and gather more data.')
 
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson for faster webhook parsing
+    
+    orjson writes datetimes as ISO 8601 rather than Flask's HTTP dates, and
+    always emits UTF-8 rather than ASCII escapes.
+    """
+    
+    def dumps(self, obj, **kwargs) -> str:
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=kwargs.get('default', self.default),
+                            option=option).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 # Flask webhook receiver
 app = Flask(__name__)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 CORS(app)
 
 # Global instances
@@ -459,6 +861,10 @@ def receive_webhook():
         data = request.json
         logger.info(f"Webhook received: {json.dumps(data)}")  # Debug log
         
+        # Uptime Kuma posts one JSON object per notification
+        if not isinstance(data, dict):
+            return jsonify({'status': 'error', 'message': 'Expected a JSON object'}), 400
+        
         # Check if this is a test notification from Uptime Kuma
         is_test = (
             data.get('msg', '').lower().find('testing') >= 0 or
@@ -489,9 +895,7 @@ def receive_webhook():
         is_recovery = event.status == 'up' and data.get('msg', '').lower().find('up') >= 0
         
         # Analyze pattern
-        recent_events = db_manager.get_recent_events(CONFIG['ANALYSIS_WINDOW'])
-        analyzer = OutageAnalyzer(db_manager)
-        analysis = analyzer.analyze_pattern(recent_events)
+        analysis = OutageAnalyzer(db_manager).analyze_recent()
         
         # Send notification if needed
         if analysis['type'] != 'ALL_OPERATIONAL':
@@ -513,8 +917,7 @@ def receive_webhook():
 async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /status command"""
     recent_events = db_manager.get_recent_events(10)
-    analyzer = OutageAnalyzer(db_manager)
-    analysis = analyzer.analyze_pattern(recent_events)
+    analysis = OutageAnalyzer(db_manager).analyze_pattern(recent_events)
     
     status_text = f"""
 📊 **CURRENT STATUS**
@@ -531,7 +934,7 @@ async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def cmd_report(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /report command - generate daily report"""
-    conn = sqlite3.connect(CONFIG['DB_PATH'], detect_types=sqlite3.PARSE_DECLTYPES)
+    conn = db_manager.reader()
     cursor = conn.cursor()
     
     # Get last 24 hours statistics
@@ -543,7 +946,7 @@ async def cmd_report(update: Update, context: ContextTypes.DEFAULT_TYPE):
             AVG(response_time) as avg_response
         FROM events
         WHERE timestamp > ?
-    ''', (yesterday,))
+    ''', (to_epoch_us(yesterday),))
     
     stats = cursor.fetchone()
     
@@ -556,7 +959,6 @@ async def cmd_report(update: Update, context: ContextTypes.DEFAULT_TYPE):
     ''', (yesterday,))
     
     outages = cursor.fetchall()
-    conn.close()
     
     report_text = f"""
 📊 **24-HOUR REPORT**
@@ -581,7 +983,7 @@ async def cmd_report(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def cmd_uptime(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /uptime command - show current uptime percentages"""
-    conn = sqlite3.connect(CONFIG['DB_PATH'], detect_types=sqlite3.PARSE_DECLTYPES)
+    conn = db_manager.reader()
     cursor = conn.cursor()
     
     # Calculate uptime for each monitor
@@ -591,12 +993,11 @@ async def cmd_uptime(update: Update, context: ContextTypes.DEFAULT_TYPE):
             COUNT(*) as total_checks,
             SUM(CASE WHEN status = 'up' THEN 1 ELSE 0 END) as up_checks
         FROM events
-        WHERE timestamp > datetime('now', '-7 days')
+        WHERE timestamp > ?
         GROUP BY monitor_name
-    ''')
+    ''', (to_epoch_us(datetime.now() - timedelta(days=7)),))
     
     monitors = cursor.fetchall()
-    conn.close()
     
     uptime_text = """
 ⏱️ **7-DAY UPTIME**
@@ -614,29 +1015,27 @@ async def cmd_uptime(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def cmd_downtime(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /downtime command - show recent outages with durations"""
-    conn = sqlite3.connect(CONFIG['DB_PATH'], detect_types=sqlite3.PARSE_DECLTYPES)
+    conn = db_manager.reader()
     cursor = conn.cursor()
     
     # Get recent down/up pairs
     cursor.execute('''
         SELECT monitor_name, status, timestamp 
         FROM events 
-        WHERE timestamp > datetime('now', '-24 hours')
+        WHERE timestamp > ?
         ORDER BY timestamp DESC
         LIMIT 50
-    ''')
+    ''', (to_epoch_us(datetime.now() - timedelta(hours=24)),))
     
     events = cursor.fetchall()
-    conn.close()
     
     # Process events to find down/up pairs
     outages = []
     down_events = {}
     
     for monitor, status, timestamp in reversed(events):
-        if isinstance(timestamp, str):
-            timestamp = datetime.fromisoformat(timestamp)
-            
+        timestamp = from_epoch_us(timestamp)
+        
         if status == 'down':
             down_events[monitor] = timestamp
         elif status == 'up' and monitor in down_events:
@@ -754,8 +1153,12 @@ def run_telegram_bot():
     logger.info(f"🚀 Bot started! Webhook on port {CONFIG['WEBHOOK_PORT']}")
     logger.info("📱 Telegram bot ready for commands")
     
-    # Start bot polling with drop_pending_updates to ignore old messages
-    telegram_app.run_polling(drop_pending_updates=True)
+    # Start bot polling with drop_pending_updates to ignore old messages;
+    # on shutdown, flush queued writes and let the writer run PRAGMA optimize
+    try:
+        telegram_app.run_polling(drop_pending_updates=True)
+    finally:
+        db_manager.close()
 
 if __name__ == '__main__':
     # Start Flask in separate thread